@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Compares the SQL generated by DatabaseOperations.date_trunc_sql() and the
+year lookup against the string-formatting versions it replaced, on a table
+seeded with a million rows.
+
+Needs a MySQL server and a database the given user may create tables in::
+
+    python benchmarks/date_trunc.py --db=bench --user=root
+"""
+
+import datetime
+import optparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import oursql
+
+from django.conf import settings
+if not settings.configured:
+    settings.configure()
+
+OLD_FORMATS = {
+    'year': "CAST(DATE_FORMAT(created, '%Y-01-01 00:00:00') AS DATETIME)",
+    'month': "CAST(DATE_FORMAT(created, '%Y-%m-01 00:00:00') AS DATETIME)",
+    'day': "CAST(DATE_FORMAT(created, '%Y-%m-%d 00:00:00') AS DATETIME)",
+    'hour': "CAST(DATE_FORMAT(created, '%Y-%m-%d %H:00:00') AS DATETIME)",
+}
+
+def new_format(lookup_type):
+    from mysql_oursql.standard.operations import DatabaseOperations
+    return DatabaseOperations().date_trunc_sql(lookup_type, 'created')
+
+def seed(cursor, rows):
+    cursor.execute("DROP TABLE IF EXISTS bench_dates", plain_query=True)
+    cursor.execute("""
+        CREATE TABLE bench_dates (
+            id integer AUTO_INCREMENT PRIMARY KEY,
+            created datetime NOT NULL,
+            KEY (created)
+        ) ENGINE=InnoDB""", plain_query=True)
+    start = datetime.datetime(2000, 1, 1)
+    span = 10 * 365 * 24 * 3600
+    batch = 1000
+    for offset in xrange(0, rows, batch):
+        values = ','.join(["('%s')" % (start + datetime.timedelta(seconds=random.randint(0, span)))
+                           for i in xrange(min(batch, rows - offset))])
+        cursor.execute("INSERT INTO bench_dates (created) VALUES %s" % values, plain_query=True)
+
+def timed(cursor, sql):
+    start = time.time()
+    cursor.execute(sql, plain_query=True)
+    cursor.fetchall()
+    return time.time() - start
+
+def explain(cursor, sql):
+    cursor.execute("EXPLAIN " + sql, plain_query=True)
+    names = [d[0] for d in cursor.description]
+    row = dict(zip(names, cursor.fetchone()))
+    return '%s key=%s rows=%s' % (row['type'], row['key'], row['rows'])
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--host', default='localhost')
+    parser.add_option('--user', default='root')
+    parser.add_option('--passwd', default='')
+    parser.add_option('--db', default='test')
+    parser.add_option('--rows', type='int', default=1000000)
+    parser.add_option('--no-seed', action='store_true', default=False)
+    options, args = parser.parse_args()
+
+    connection = oursql.connect(host=options.host, user=options.user,
+                                passwd=options.passwd, db=options.db,
+                                autoreconnect=True)
+    cursor = connection.cursor()
+    if not options.no_seed:
+        print "Seeding %d rows..." % options.rows
+        seed(cursor, options.rows)
+        connection.commit()
+
+    print "%-8s %12s %12s" % ('trunc', 'before (s)', 'after (s)')
+    for lookup_type, old in sorted(OLD_FORMATS.items()):
+        before = timed(cursor, "SELECT DISTINCT %s FROM bench_dates" % old)
+        after = timed(cursor, "SELECT DISTINCT %s FROM bench_dates" % new_format(lookup_type))
+        print "%-8s %12.3f %12.3f" % (lookup_type, before, after)
+
+    from mysql_oursql.standard.operations import DatabaseOperations
+    first, last = DatabaseOperations().year_lookup_bounds(2005)
+    by_function = "SELECT COUNT(*) FROM bench_dates WHERE YEAR(created) = 2005"
+    by_range = "SELECT COUNT(*) FROM bench_dates WHERE created BETWEEN '%s' AND '%s'" % (first, last)
+    print
+    print "year lookup, YEAR():  %.3fs  %s" % (timed(cursor, by_function), explain(cursor, by_function))
+    print "year lookup, BETWEEN: %.3fs  %s" % (timed(cursor, by_range), explain(cursor, by_range))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Compares reading polygons as WKT, which is what the GIS backend does by
+default, with reading them as WKB, as it does with
+``OPTIONS['geometry_format'] = 'wkb'``, from a table seeded with large
+polygons. Each is timed from the query to a GEOSGeometry per row.
+
+Needs a MySQL server, a database the given user may create tables in, and
+GEOS::
+
+    python benchmarks/geometry.py --db=bench --user=root
+"""
+
+import math
+import optparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import oursql
+
+from django.conf import settings
+if not settings.configured:
+    settings.configure()
+
+from django.contrib.gis.geos import GEOSGeometry
+
+def polygon(vertices):
+    x, y = random.uniform(-170, 170), random.uniform(-80, 80)
+    points = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        radius = random.uniform(0.5, 1.0)
+        points.append('%.8f %.8f' % (x + radius * math.cos(angle), y + radius * math.sin(angle)))
+    points.append(points[0])
+    return 'POLYGON((%s))' % ', '.join(points)
+
+def seed(cursor, rows, vertices):
+    cursor.execute("DROP TABLE IF EXISTS bench_polygons", plain_query=True)
+    cursor.execute("""
+        CREATE TABLE bench_polygons (
+            id integer AUTO_INCREMENT PRIMARY KEY,
+            shape polygon NOT NULL
+        ) ENGINE=MyISAM""", plain_query=True)
+    for offset in xrange(0, rows, 100):
+        values = ','.join(["(GeomFromText('%s'))" % polygon(vertices)
+                           for i in xrange(min(100, rows - offset))])
+        cursor.execute("INSERT INTO bench_polygons (shape) VALUES %s" % values, plain_query=True)
+
+def read_wkt(cursor):
+    cursor.execute("SELECT AsText(shape) FROM bench_polygons", plain_query=True)
+    for (value,) in cursor:
+        GEOSGeometry(value)
+
+def read_wkb(cursor):
+    from mysql_oursql.gis.base import wkb_converter
+    convert = wkb_converter((0,))
+    cursor.execute("SELECT shape FROM bench_polygons", plain_query=True)
+    for row in cursor:
+        GEOSGeometry(convert(row)[0])
+
+def timed(func, cursor):
+    start = time.time()
+    func(cursor)
+    return time.time() - start
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--host', default='localhost')
+    parser.add_option('--user', default='root')
+    parser.add_option('--passwd', default='')
+    parser.add_option('--db', default='test')
+    parser.add_option('--rows', type='int', default=20000)
+    parser.add_option('--vertices', type='int', default=200)
+    parser.add_option('--no-seed', action='store_true', default=False)
+    options, args = parser.parse_args()
+
+    connection = oursql.connect(host=options.host, user=options.user,
+                                passwd=options.passwd, db=options.db)
+    cursor = connection.cursor()
+    if not options.no_seed:
+        print "Seeding %d polygons of %d vertices..." % (options.rows, options.vertices)
+        seed(cursor, options.rows, options.vertices)
+        connection.commit()
+
+    print "WKT: %.3fs" % timed(read_wkt, cursor)
+    print "WKB: %.3fs" % timed(read_wkb, cursor)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the backend's hot paths.
+
+By default everything runs against ``stub_oursql``, which answers every
+query instantly, so the numbers are the backend's own overhead and need no
+server. With ``--server`` the same benchmarks run against a real MySQL or
+MariaDB database (which must exist and be writable), along with MySQLdb for
+comparison if it is installed::
+
+    python benchmarks/run.py
+    python benchmarks/run.py --server --db=bench --user=root --json=results.json
+
+Pass benchmark names to run only some of them.
+"""
+
+import json
+import optparse
+import os
+import platform
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WIDE_COLUMNS = 30
+ROWS = 10000
+TABLES = 900
+
+benchmarks = []
+
+def benchmark(func):
+    benchmarks.append(func)
+    return func
+
+def setup(options):
+    if not options.server:
+        import stub_oursql
+        sys.modules['oursql'] = stub_oursql
+        narrow = [(i,) for i in xrange(ROWS)]
+        wide = [tuple(range(i, i + WIDE_COLUMNS)) for i in xrange(ROWS)]
+        stub_oursql.respond('SELECT id FROM bench_rows', [('id', 3)], narrow)
+        stub_oursql.respond('SELECT * FROM bench_rows', [('c%d' % i, 3) for i in range(WIDE_COLUMNS)], wide)
+
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(DEBUG=False)
+
+    def settings_dict(**opts):
+        return {
+            'ENGINE': 'mysql_oursql.standard',
+            'NAME': options.db, 'USER': options.user, 'PASSWORD': options.passwd,
+            'HOST': options.host, 'PORT': '', 'OPTIONS': opts,
+            'TEST_NAME': None, 'TEST_CHARSET': None, 'TEST_COLLATION': None,
+            'TEST_MIRROR': None, 'TIME_ZONE': None,
+        }
+    from mysql_oursql.standard.base import DatabaseWrapper
+    context = {
+        'db': DatabaseWrapper(settings_dict(), 'default'),
+        'db_no_ping': DatabaseWrapper(settings_dict(health_check='never'), 'no_ping'),
+    }
+    if options.server:
+        seed(context['db'])
+    return context
+
+def seed(db):
+    cursor = db.cursor()
+    cursor.execute("DROP TABLE IF EXISTS bench_rows", plain_query=True)
+    cursor.execute("CREATE TABLE bench_rows (id integer PRIMARY KEY, %s)" %
+                   ', '.join(['c%d integer' % i for i in range(1, WIDE_COLUMNS)]), plain_query=True)
+    cursor.executemany("INSERT INTO bench_rows VALUES (%s)" % ', '.join(['%s'] * WIDE_COLUMNS),
+                       [tuple(range(i, i + WIDE_COLUMNS)) for i in xrange(ROWS)])
+    cursor.execute("DROP TABLE IF EXISTS bench_insert", plain_query=True)
+    cursor.execute("CREATE TABLE bench_insert (id integer AUTO_INCREMENT PRIMARY KEY, "
+                   "name varchar(100), value integer)", plain_query=True)
+    db._commit()
+
+QUERY = ("SELECT `app_model`.`id`, `app_model`.`name`, `app_model`.`created` "
+         "FROM `app_model` WHERE (`app_model`.`name` LIKE %s AND `app_model`.`id` IN (%s, %s, %s)) "
+         "ORDER BY `app_model`.`created` DESC LIMIT 21")
+
+@benchmark
+def rewrite(context):
+    from mysql_oursql.standard.base import _replace_param, params_re, rewrite_query
+    yield 'rewrite_uncached', 100000, lambda: params_re.sub(_replace_param, QUERY)
+    yield 'rewrite_cached', 100000, lambda: rewrite_query(QUERY)
+
+@benchmark
+def execute(context):
+    from mysql_oursql.standard.base import CursorWrapper, rewrite_query
+    db = context['db']
+    db.cursor()
+    raw = db.connection.cursor()
+    wrapped = CursorWrapper(db.connection.cursor(), db)
+    query = "SELECT id FROM bench_rows WHERE id = %s"
+    rewritten = rewrite_query(query)
+    def run_raw():
+        raw.execute(rewritten, (1,))
+        raw.fetchall()
+    def run_wrapped():
+        wrapped.execute(query, (1,))
+        wrapped.fetchall()
+    yield 'execute_raw', 10000, run_raw
+    yield 'execute_wrapped', 10000, run_wrapped
+
+@benchmark
+def cursor(context):
+    yield 'cursor_ping', 10000, context['db'].cursor
+    yield 'cursor_no_ping', 10000, context['db_no_ping'].cursor
+
+@benchmark
+def executemany(context):
+    from mysql_oursql.standard.base import CursorWrapper
+    db = context['db']
+    rows = [('name %d' % i, i) for i in xrange(1000)]
+    query = "INSERT INTO bench_insert (name, value) VALUES (%s, %s)"
+    per_row = CursorWrapper(db.cursor().cursor)
+    batched = db.cursor()
+    yield 'executemany_per_row_1000', 10, lambda: per_row.executemany(query, rows)
+    yield 'executemany_batched_1000', 10, lambda: batched.executemany(query, rows)
+
+def _fetch(context, query, method):
+    cursor = context['db'].cursor()
+    if method == 'fetchone':
+        def run():
+            cursor.execute(query, plain_query=True)
+            while cursor.fetchone() is not None:
+                pass
+    elif method == 'fetchmany':
+        def run():
+            cursor.execute(query, plain_query=True)
+            while cursor.fetchmany(100):
+                pass
+    else:
+        def run():
+            cursor.execute(query, plain_query=True)
+            for row in cursor:
+                pass
+    return run
+
+@benchmark
+def fetch(context):
+    for width, query in (('narrow', "SELECT id FROM bench_rows"),
+                         ('wide', "SELECT * FROM bench_rows")):
+        for method in ('fetchone', 'fetchmany', 'iterate'):
+            yield 'fetch_%s_%s_%d' % (width, method, ROWS), 5, _fetch(context, query, method)
+
+@benchmark
+def per_row(context):
+    # The difference between the two is the wrapper's overhead per row.
+    from mysql_oursql.standard.base import CursorWrapper
+    db = context['db']
+    db.cursor()
+    raw = db.connection.cursor()
+    wrapped = CursorWrapper(db.connection.cursor(), db)
+    query = "SELECT id FROM bench_rows"
+    def run(cursor):
+        def inner():
+            cursor.execute(query, plain_query=True)
+            while cursor.fetchone() is not None:
+                pass
+        return inner
+    yield 'per_row_fetchone_raw_%d' % ROWS, 5, run(raw)
+    yield 'per_row_fetchone_wrapped_%d' % ROWS, 5, run(wrapped)
+
+@benchmark
+def mysqldb(context):
+    options = context['options']
+    if not options.server:
+        return
+    try:
+        import MySQLdb
+    except ImportError:
+        return
+    connection = MySQLdb.connect(host=options.host, user=options.user,
+                                 passwd=options.passwd, db=options.db)
+    cursor = connection.cursor()
+    def run(query):
+        def inner():
+            cursor.execute(query)
+            while cursor.fetchmany(100):
+                pass
+        return inner
+    yield 'mysqldb_fetch_narrow_fetchmany_%d' % ROWS, 5, run("SELECT id FROM bench_rows")
+    yield 'mysqldb_fetch_wide_fetchmany_%d' % ROWS, 5, run("SELECT * FROM bench_rows")
+
+@benchmark
+def introspection(context):
+    db = context['db']
+    if not context['options'].server:
+        import stub_oursql
+        tables = ['table_%d' % i for i in range(TABLES)]
+        stub_oursql.respond('SHOW TABLES', [('name', 253)], [(t,) for t in tables])
+        columns = []
+        for t in tables:
+            columns.extend([(t, 'id', 'int', 11, 11, 0, 'NO'), (t, 'other_id', 'int', 11, 11, 0, 'YES')])
+        indexes = [(t, 'id', 'PRIMARY', 0) for t in tables]
+        # The queries made by load_schema()...
+        stub_oursql.respond('SELECT table_name, column_name, data_type', [], columns)
+        stub_oursql.respond('SELECT table_name, column_name, referenced_table_name', [], [])
+        stub_oursql.respond('SELECT table_name, column_name, index_name', [], indexes)
+        # ...and those it replaces.
+        stub_oursql.respond('SELECT * FROM `', [('id', 3), ('other_id', 3)], [])
+        stub_oursql.respond('SELECT column_name, referenced_table_name', [], [])
+        stub_oursql.respond('SHOW INDEX', [], [(t, 0, 'PRIMARY', 1, 'id') for t in tables[:1]])
+    introspection = db.introspection
+    def walk():
+        cursor = db.cursor()
+        for table in introspection.get_table_list(cursor):
+            introspection.get_table_description(cursor, table)
+            introspection.get_relations(cursor, table)
+            introspection.get_indexes(cursor, table)
+    def walk_bulk():
+        cursor = db.cursor()
+        with introspection.bulk(cursor):
+            walk()
+    yield 'introspection_per_table', 1, walk
+    yield 'introspection_bulk', 1, walk_bulk
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [benchmark ...]')
+    parser.add_option('--server', action='store_true', default=False,
+                      help='run against a real server instead of the stub')
+    parser.add_option('--host', default='localhost')
+    parser.add_option('--user', default='root')
+    parser.add_option('--passwd', default='')
+    parser.add_option('--db', default='test')
+    parser.add_option('--repeat', type='int', default=3)
+    parser.add_option('--json', metavar='FILE', help='also write the results to FILE as JSON')
+    options, names = parser.parse_args()
+
+    context = setup(options)
+    context['options'] = options
+    results = []
+    for func in benchmarks:
+        if names and func.__name__ not in names:
+            continue
+        for name, number, run in func(context) or ():
+            best = min(timeit.Timer(run).repeat(options.repeat, number)) / number
+            results.append({'name': name, 'calls': number, 'seconds_per_call': best})
+            print '%-40s %12.2f us' % (name, best * 1e6)
+
+    if options.json:
+        output = {
+            'mode': options.server and 'server' or 'stub',
+            'python': platform.python_version(),
+            'timestamp': time.time(),
+            'results': results,
+        }
+        f = open(options.json, 'w')
+        try:
+            json.dump(output, f, indent=2)
+        finally:
+            f.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+A stand-in for the oursql module which never talks to a server, so the
+backend's own overhead can be benchmarked offline.
+
+Results are canned: ``respond(prefix, description, rows)`` makes every
+query starting with ``prefix`` return ``rows``; anything else returns
+``default_rows`` described by ``default_description``.
+"""
+
+class Error(Exception):
+    pass
+
+class Warning(Exception):
+    pass
+
+class InterfaceError(Error):
+    pass
+
+class DatabaseError(Error):
+    pass
+
+class OperationalError(DatabaseError):
+    pass
+
+class IntegrityError(DatabaseError):
+    pass
+
+class ProgrammingError(DatabaseError):
+    pass
+
+class NotSupportedError(DatabaseError):
+    pass
+
+default_description = [('id', 3, None, 11, 11, 0, False)]
+default_rows = [(1,)]
+responses = []
+
+def respond(prefix, description, rows):
+    responses.insert(0, (prefix.upper(), description, rows))
+
+respond('SELECT @@MAX_ALLOWED_PACKET', [('a', 8), ('b', 8)], [(16777216, 16382)])
+respond('SHOW SLAVE STATUS', [], [])
+
+class Cursor(object):
+    arraysize = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = iter(())
+
+    def execute(self, query, params=(), plain_query=False):
+        head = query.lstrip()[:64].upper()
+        for prefix, description, rows in responses:
+            if head.startswith(prefix):
+                break
+        else:
+            description, rows = default_description, default_rows
+        if head.startswith('SELECT') or head.startswith('SHOW'):
+            self.description = description
+            self.rowcount = len(rows)
+            self._rows = iter(rows)
+        else:
+            self.description = None
+            self.rowcount = max(1, query.count('),(') + 1)
+            self.lastrowid = 1
+            self._rows = iter(())
+
+    def executemany(self, query, params):
+        for args in params:
+            self.execute(query, args)
+
+    def fetchone(self):
+        for row in self._rows:
+            return row
+        return None
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        rows = []
+        for row in self._rows:
+            rows.append(row)
+            if len(rows) >= size:
+                break
+        return rows
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+class Connection(object):
+    server_info = '5.1.73'
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def cursor(self):
+        return Cursor(self)
+
+    def ping(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def connect(**kwargs):
+    return Connection(**kwargs)
@@ -15,11 +15,16 @@ class FIELD_TYPE:
     SHORT = 2
     STRING = 254
     TIMESTAMP = 7
+    TIME = 11
     TINY = 1
     TINY_BLOB = 249
     MEDIUM_BLOB = 250
     LONG_BLOB = 251
     VAR_STRING = 253
+    YEAR = 13
+    BIT = 16
+    ENUM = 247
+    SET = 248
     
     # gis constants
     GEOMETRY = 255
\ No newline at end of file
@@ -0,0 +1,12 @@
+class WKBAdapter(str):
+    """
+    Passes a geometry to MySQL as raw WKB bytes, to be read with
+    GeomFromWKB(), rather than as WKT the server has to parse.
+    """
+    def __new__(cls, geom):
+        adapter = str.__new__(cls, geom.wkb)
+        adapter.srid = geom.srid
+        return adapter
+
+    def prepare_database_save(self, unused):
+        return self
@@ -1,12 +1,81 @@
+from itertools import imap
+
+from mysql_oursql.constants import FIELD_TYPE
+from mysql_oursql.standard.base import CursorWrapper, StreamingCursorWrapper
 from mysql_oursql.standard.base import DatabaseWrapper as MySQLDatabaseWrapper
 from mysql_oursql.gis.creation import MySQLCreation
 from mysql_oursql.gis.introspection import MySQLIntrospection
 from mysql_oursql.gis.operations import MySQLOperations
 
+def geometry_columns(description):
+    "Returns the positions of the geometry columns in a cursor.description."
+    return tuple([i for i, column in enumerate(description or ()) if column[1] == FIELD_TYPE.GEOMETRY])
+
+def wkb_converter(positions):
+    """
+    Returns a function which replaces the geometries at ``positions`` in a
+    row with WKB. MySQL's own representation of a geometry, which is what
+    selecting the column returns, is a four byte SRID followed by the WKB,
+    so this is just a buffer over the rest of the value.
+    """
+    def convert(row):
+        if row is None:
+            return None
+        row = list(row)
+        for i in positions:
+            if row[i] is not None:
+                row[i] = buffer(row[i], 4)
+        return tuple(row)
+    return convert
+
+class GeometryCursorMixin(object):
+    """
+    Used with ``OPTIONS['geometry_format'] = 'wkb'`` to hand out geometry
+    columns as WKB buffers, which GEOSGeometry reads directly.
+    """
+    __slots__ = ()
+
+    def __init__(self, cursor, db=None):
+        self._geometry_columns = ()
+        super(GeometryCursorMixin, self).__init__(cursor, db)
+
+    def _bind(self):
+        super(GeometryCursorMixin, self)._bind()
+        if self._geometry_columns:
+            convert = wkb_converter(self._geometry_columns)
+            fetchone, fetchmany, fetchall = self.fetchone, self.fetchmany, self.fetchall
+            self.fetchone = lambda: convert(fetchone())
+            self.fetchmany = lambda *args: map(convert, fetchmany(*args))
+            self.fetchall = lambda: map(convert, fetchall())
+
+    def execute(self, query, args=(), **kwargs):
+        result = super(GeometryCursorMixin, self).execute(query, args, **kwargs)
+        positions = geometry_columns(self._cursor.description)
+        if positions != self._geometry_columns:
+            self._geometry_columns = positions
+            self._bind()
+        return result
+
+    def __iter__(self):
+        rows = super(GeometryCursorMixin, self).__iter__()
+        if self._geometry_columns:
+            return imap(wkb_converter(self._geometry_columns), rows)
+        return rows
+
+class GeometryCursorWrapper(GeometryCursorMixin, CursorWrapper):
+    __slots__ = ('_geometry_columns',)
+
+class GeometryStreamingCursorWrapper(GeometryCursorMixin, StreamingCursorWrapper):
+    __slots__ = ('_geometry_columns',)
+
 class DatabaseWrapper(MySQLDatabaseWrapper):
+    backend_options = MySQLDatabaseWrapper.backend_options + ('geometry_format',)
 
     def __init__(self, *args, **kwargs):
         super(DatabaseWrapper, self).__init__(*args, **kwargs)
+        if self.settings_dict['OPTIONS'].get('geometry_format') == 'wkb':
+            self.cursor_wrapper = GeometryCursorWrapper
+            self.streaming_cursor_wrapper = GeometryStreamingCursorWrapper
         self.creation = MySQLCreation(self)
-        self.ops = MySQLOperations()
+        self.ops = MySQLOperations(self)
         self.introspection = MySQLIntrospection(self)
@@ -3,6 +3,8 @@ from mysql_oursql.standard.operations import DatabaseOperations
 from django.contrib.gis.db.backends.adapter import WKTAdapter
 from django.contrib.gis.db.backends.base import BaseSpatialOperations
 
+from mysql_oursql.gis.adapter import WKBAdapter
+
 class MySQLOperations(DatabaseOperations, BaseSpatialOperations):
 
     compiler_module = 'django.contrib.gis.db.models.sql.compiler'
@@ -31,19 +33,27 @@ class MySQLOperations(DatabaseOperations, BaseSpatialOperations):
 
     gis_terms = dict([(term, None) for term in geometry_functions.keys() + ['isnull']])
 
+    def __init__(self, connection=None):
+        super(MySQLOperations, self).__init__(connection)
+        if connection is not None and connection.settings_dict['OPTIONS'].get('geometry_format') == 'wkb':
+            # Geometries are selected as they are and turned into WKB by the
+            # cursor, and written as WKB, so neither side handles any WKT.
+            self.select = None
+            self.Adapter = WKBAdapter
+
     def geo_db_type(self, f):
         return f.geom_type
 
     def get_geom_placeholder(self, value, srid):
         """
-        The placeholder here has to include MySQL's WKT constructor.  Because
+        The placeholder here has to include MySQL's WKT (or WKB) constructor.  Because
         MySQL does not support spatial transformations, there is no need to
         modify the placeholder based on the contents of the given value.
         """
         if hasattr(value, 'expression'):
             placeholder = '%s.%s' % tuple(map(self.quote_name, value.cols[value.expression]))
         else:
-            placeholder = '%s(%%s)' % self.from_text
+            placeholder = '%s(%%s)' % (self.Adapter is WKBAdapter and self.from_wkb or self.from_text)
         return placeholder
 
     def spatial_lookup_sql(self, lvalue, lookup_type, value, field, qn):
@@ -6,6 +6,11 @@ Requires oursql: https://launchpad.net/oursql
 
 import sys
 import re
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import wraps
+from itertools import islice
 
 try:
     import oursql as Database
@@ -13,7 +18,7 @@ except ImportError, e:
     from django.core.exceptions import ImproperlyConfigured
     raise ImproperlyConfigured("Error loading oursql module: %s" % e)
 
-from django.db import utils
+from django.db import transaction, utils
 from django.db.backends import *
 from django.db.backends.signals import connection_created
 from mysql_oursql.standard.client import DatabaseClient
@@ -21,6 +26,12 @@ from mysql_oursql.standard.creation import DatabaseCreation
 from mysql_oursql.standard.introspection import DatabaseIntrospection
 from mysql_oursql.standard.validation import DatabaseValidation
 from mysql_oursql.standard.operations import DatabaseOperations
+from mysql_oursql.standard import caching, columnar, loading, pool, replicas, scanning
+from mysql_oursql.standard.retry import RetryPolicy
+from mysql_oursql.standard.instrumentation import QueryEvent, listeners, notify, row_bytes
+from mysql_oursql.standard.statements import StatementCache
+from mysql_oursql.standard.tracking import WriteTracker
+from mysql_oursql.standard.utils import LRUCache
 # from django.utils.safestring import SafeString, SafeUnicode
 
 # Raise exceptions for database warnings if DEBUG is on
@@ -38,7 +49,63 @@ IntegrityError = Database.IntegrityError
 # http://dev.mysql.com/doc/refman/5.0/en/news.html .
 server_version_re = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{1,2})')
 
-params_re = re.compile(r'%[a-zA-Z]')
+# The version and limits of each server connected to, keyed by host. They're
+# the same for every connection, so are only looked up once per process.
+server_capabilities = {}
+
+# Matches, in order of preference: a quoted literal or identifier (which must
+# be copied through untouched, apart from unescaping ``%%``), an escaped
+# percent sign, or a Django-style placeholder.
+params_re = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`[^`]*`)|(%%)|(%[a-zA-Z])""", re.S)
+
+# Django sends the same query shapes over and over, so the rewritten form of
+# each one is kept around rather than re-scanning the SQL on every execute().
+query_cache = LRUCache(maxsize=getattr(settings, 'OURSQL_QUERY_CACHE_SIZE', 2048))
+
+def _replace_param(match):
+    literal, escape, param = match.groups()
+    if literal is not None:
+        return literal.replace('%%', '%')
+    if escape is not None:
+        return '%'
+    return '?'
+
+def rewrite_query(query):
+    """
+    Converts a query using Django's ``%s`` placeholders into oursql's ``?``
+    form. ``%%`` is unescaped, and placeholders inside quoted literals are
+    left alone.
+    """
+    rewritten = query_cache.get(query)
+    if rewritten is None:
+        rewritten = params_re.sub(_replace_param, query)
+        query_cache.set(query, rewritten)
+    return rewritten
+
+# Statements which can safely be re-sent on a fresh connection if the server
+# went away underneath them.
+read_query_re = re.compile(r'^\s*(SELECT|SHOW|DESCRIBE|DESC|EXPLAIN)\b', re.I)
+
+# A rewritten single-row INSERT whose VALUES clause holds nothing but
+# placeholders, and so can be repeated to insert many rows at once.
+insert_values_re = re.compile(r'^(\s*INSERT\s+(?:IGNORE\s+)?INTO\s+.+?\s+VALUES\s*)(\(\s*\?(?:\s*,\s*\?)*\s*\))\s*$', re.I | re.S)
+
+def _param_size(value):
+    """
+    A cheap upper estimate of the bytes a parameter takes up on the wire,
+    including the type and length prefix sent with it.
+    """
+    if value is None:
+        return 2
+    if isinstance(value, unicode):
+        # utf8 needs at most three bytes per character.
+        return len(value) * 3 + 11
+    if isinstance(value, (str, buffer, bytearray)):
+        return len(value) + 11
+    if isinstance(value, Decimal):
+        # Sent as its string representation, which can be arbitrarily long.
+        return len(str(value)) + 11
+    return 34
 
 # TODO: monkey patch django to support our package in areas such as GIS is not a good solution
 try:
@@ -55,19 +122,210 @@ class CursorWrapper(object):
 
     Implemented as a wrapper, rather than a subclass, so that we aren't stuck
     to the particular underlying representation returned by Connection.cursor().
+
+    The fetch methods are called once per row (or chunk), so rather than
+    being looked up through __getattr__ each time they are bound directly to
+    the underlying cursor's, and rebound whenever that cursor is swapped.
     """
     codes_for_integrityerror = (1048,)
+    # "MySQL server has gone away" and "Lost connection to MySQL server".
+    codes_for_reconnect = (2006, 2013)
+    # Errors after which a replica is taken out of rotation and the query
+    # sent to the primary instead.
+    codes_for_replica_failure = (2003, 2006, 2013)
+    # MySQL refuses to prepare statements with more placeholders than this.
+    max_placeholders = 65535
 
-    def __init__(self, cursor):
+    __slots__ = ('_cursor', 'db', '_rowcount', '_own_cursor', '_statement',
+                 '_retried', '_reconnected', '_query', '_observed',
+                 'fetchone', 'fetchmany', 'fetchall', '__weakref__')
+
+    def __init__(self, cursor, db=None):
+        self.db = db
+        self._rowcount = None
+        # The cursor this wrapper was created with, and the query whose
+        # cached prepared statement cursor is in use instead of it, if any.
+        self._own_cursor = cursor
+        self._statement = None
+        self._retried = False
+        self._reconnected = False
+        self._query = None
         self.cursor = cursor
-        
+
+    def _get_cursor(self):
+        return self._cursor
+
+    def _set_cursor(self, cursor):
+        self._cursor = cursor
+        self._bind()
+
+    cursor = property(_get_cursor, _set_cursor)
+
+    def _bind(self):
+        """
+        Points fetchone(), fetchmany() and fetchall() at the underlying
+        cursor's own methods, so that reading rows costs no more than it
+        would without the wrapper. While query listeners are registered
+        they go through the instrumented versions instead.
+        """
+        self._observed = bool(listeners)
+        if self._observed:
+            self.fetchone = self._fetchone
+            self.fetchmany = self._fetchmany
+            self.fetchall = self._fetchall
+        else:
+            cursor = self._cursor
+            self.fetchone = cursor.fetchone
+            self.fetchmany = cursor.fetchmany
+            self.fetchall = cursor.fetchall
+
+    @property
+    def rowcount(self):
+        if self._rowcount is not None:
+            return self._rowcount
+        return self._cursor.rowcount
+
+    def _get_arraysize(self):
+        return self._cursor.arraysize
+
+    def _set_arraysize(self, size):
+        self._cursor.arraysize = size
+
+    arraysize = property(_get_arraysize, _set_arraysize)
+
     def _replace_params(self, query):
-        return params_re.sub('?', query)
+        return rewrite_query(query)
+
+    def _can_retry(self, query):
+        """
+        Reads issued outside of a managed transaction can be replayed on a new
+        connection without changing their meaning.
+        """
+        if self.db is None or not read_query_re.match(query):
+            return False
+        return not transaction.is_managed(using=self.db.alias)
+
+    def _can_retry_lock_error(self, error, attempt):
+        """
+        Statements outside of managed transactions which hit a deadlock or
+        lock wait timeout are retried according to ``OPTIONS['retry']``.
+        Inside a transaction the whole block has to be retried instead; see
+        DatabaseWrapper.retry_transaction().
+
+        A deadlock rolls back the whole of MySQL's implicit transaction, not
+        just the statement, so it's only retried if nothing was written
+        before it; replaying the statement alone would otherwise commit half
+        of the work.
+        """
+        if self.db is None or self.db.retry_policy is None:
+            return False
+        if transaction.is_managed(using=self.db.alias):
+            return False
+        if error[0] != 1205 and self.db.uncommitted_writes:
+            return False
+        return self.db.retry_policy.should_retry(error, attempt)
 
     def execute(self, query, args=(), **kwargs):
         query = self._replace_params(query)
+        self._rowcount = None
+        execute = self._execute
+        if self.db is not None and self.db.result_cache is not None:
+            execute = self._execute_cached
+        if listeners:
+            if not self._observed:
+                self._bind()
+            return self._instrumented('execute', execute, query, args, kwargs)
+        if self._observed:
+            self._bind()
+        return execute(query, args, kwargs)
+
+    def _instrumented(self, kind, method, query, args, kwargs):
+        """
+        Runs ``method`` and reports the call to the registered query
+        listeners.
+        """
+        self._retried = self._reconnected = False
+        self._query = query
+        start = time.time()
+        error = None
+        try:
+            try:
+                return method(query, args, kwargs)
+            except Exception, e:
+                error = e
+                raise
+        finally:
+            notify(QueryEvent(kind, self.db and self.db.alias, query,
+                time.time() - start, rows=error is None and self.rowcount or None,
+                retry=self._retried, reconnect=self._reconnected,
+                error=error))
+
+    def _fetched(self, start, rows):
+        notify(QueryEvent('fetch', self.db and self.db.alias,
+            self._query, time.time() - start,
+            rows=len(rows), bytes=row_bytes(rows)))
+
+    def _release_statement(self):
+        if self._statement is not None:
+            statements = self.db.connection_state.get('statements')
+            if statements is not None:
+                statements.release(self._statement, self)
+            self._statement = None
+        if self._cursor is not self._own_cursor:
+            self.cursor = self._own_cursor
+
+    def _execute_prepared(self, statements, query, args, kwargs):
+        if self._statement != query:
+            self._release_statement()
+            self.cursor, prepared = statements.acquire(query, self)
+            self._statement = query
+        else:
+            prepared = True
+        return statements.execute(self._cursor, prepared, query, args, kwargs)
+
+    def _execute_cached(self, query, args, kwargs):
+        """
+        Reads the result of a cacheable query from ``OPTIONS['result_cache']``
+        if it's there, and puts it there otherwise. Either way the rows are
+        then read from a CachedCursor swapped in for the real one.
+        """
+        if self._cursor.__class__ is caching.CachedCursor:
+            # Put back the cursor of the statement the last, uncacheable,
+            # result came from before running another.
+            self._release_statement()
+        results = self.db.result_cache
+        key = results.key(query, args)
+        if key is None:
+            return self._execute(query, args, kwargs)
+        cached = results.get(key)
+        if cached is None:
+            self._execute(query, args, kwargs)
+            cached = results.set(key, self._cursor)
+            if cached.rest is not None:
+                # The rest of the result is still to be read from the
+                # statement's cursor, so it isn't handed back yet.
+                self.cursor = cached
+                return
+        self._release_statement()
+        self.cursor = cached
+
+    def _execute(self, query, args, kwargs, retry=True, attempt=0):
+        replica = statements = None
+        if self.db is not None:
+            if self.db.replica_set is not None:
+                replica = self.db.replica_cursor(query)
+            if replica is None and not kwargs.get('plain_query'):
+                statements = self.db.get_statement_cache()
         try:
-            return self.cursor.execute(query, args, **kwargs)
+            if replica is not None:
+                self._release_statement()
+                self.cursor = replica
+                result = replica.execute(query, args, **kwargs)
+            elif statements is not None:
+                result = self._execute_prepared(statements, query, args, kwargs)
+            else:
+                self._release_statement()
+                result = self._cursor.execute(query, args, **kwargs)
         except Database.IntegrityError, e:
             raise utils.IntegrityError, utils.IntegrityError(*tuple(e)), sys.exc_info()[2]
         except Database.OperationalError, e:
@@ -75,12 +333,57 @@ class CursorWrapper(object):
             # misclassified and Django would prefer the more logical place.
             if e[0] in self.codes_for_integrityerror:
                 raise utils.IntegrityError, utils.IntegrityError(*tuple(e)), sys.exc_info()[2]
+            if replica is not None and e[0] in self.codes_for_replica_failure:
+                self.db.replica_failed()
+                return self._execute(query, args, kwargs, retry)
+            if retry and e[0] in self.codes_for_reconnect and self._can_retry(query):
+                self._statement = None
+                self._retried = self._reconnected = True
+                self.cursor = self._own_cursor = self.db.reconnect().cursor()
+                return self._execute(query, args, kwargs, retry=False)
+            if self._can_retry_lock_error(e, attempt):
+                self._retried = True
+                return self._execute(query, args, kwargs, retry, attempt + 1)
             raise
+        if self.db is not None:
+            self.db.last_used = time.time()
+            if replica is None and not read_query_re.match(query):
+                self.db.uncommitted_writes = True
+            if self.db.write_tracker is not None:
+                self.db.write_tracker.record(query)
+            if self.db.result_cache is not None:
+                self.db.result_cache.record(query)
+        return result
 
     def executemany(self, query, args, **kwargs):
         query = self._replace_params(query)
+        self._rowcount = None
+        if listeners:
+            if not self._observed:
+                self._bind()
+            return self._instrumented('executemany', self._executemany, query, args, kwargs)
+        if self._observed:
+            self._bind()
+        return self._executemany(query, args, kwargs)
+
+    def _executemany(self, query, args, kwargs):
+        if self.db is not None:
+            match = insert_values_re.match(query)
+            if match is not None:
+                return self._executemany_insert(match.group(1), match.group(2), args, kwargs)
+        self._release_statement()
+        if self.db is not None:
+            if self.db.replica_set is not None and not read_query_re.match(query):
+                self.db.pin_to_primary()
+            if self.db.write_tracker is not None:
+                self.db.write_tracker.record(query)
+            if self.db.result_cache is not None:
+                self.db.result_cache.record(query)
         try:
-            return self.cursor.executemany(query, args, **kwargs)
+            result = self._cursor.executemany(query, args, **kwargs)
+            if self.db is not None and not read_query_re.match(query):
+                self.db.uncommitted_writes = True
+            return result
         except Database.IntegrityError, e:
             raise utils.IntegrityError, utils.IntegrityError(*tuple(e)), sys.exc_info()[2]
         except Database.OperationalError, e:
@@ -90,14 +393,149 @@ class CursorWrapper(object):
                 raise utils.IntegrityError, utils.IntegrityError(*tuple(e)), sys.exc_info()[2]
             raise
 
+    def _insert_batches(self, row, args):
+        """
+        Splits ``args`` into batches small enough to be sent as a single
+        multi-row INSERT without exceeding ``max_allowed_packet``.
+        """
+        limit = max(1, self.max_placeholders // row.count('?'))
+        # Leave some room for the INSERT INTO ... VALUES prefix.
+        budget = self.db.get_max_allowed_packet() - 4096
+        batch, size = [], 0
+        for params in args:
+            params_size = len(row) + 1
+            for value in params:
+                params_size += _param_size(value)
+            if batch and (len(batch) >= limit or size + params_size > budget):
+                yield batch
+                batch, size = [], 0
+            batch.append(params)
+            size += params_size
+        if batch:
+            yield batch
+
+    def _executemany_insert(self, prefix, row, args, kwargs):
+        """
+        Sends the rows of an ``INSERT ... VALUES (...)`` as a few multi-row
+        INSERTs rather than one statement per row. ``rowcount`` is the total
+        across all batches; ``lastrowid`` refers to the first row of the
+        last batch, as it would with a hand-written multi-row INSERT.
+        """
+        rowcount = 0
+        for batch in self._insert_batches(row, args):
+            query = prefix + ','.join([row] * len(batch))
+            params = []
+            for values in batch:
+                params.extend(values)
+            self._execute(query, params, kwargs, retry=False)
+            rowcount += self._cursor.rowcount
+        self._rowcount = rowcount
+
+    # The instrumented fetch methods, bound in place of the cursor's own
+    # while there are query listeners; see _bind().
+
+    def _fetchone(self):
+        start = time.time()
+        row = self._cursor.fetchone()
+        self._fetched(start, row is not None and [row] or [])
+        return row
+
+    def _fetchmany(self, size=None):
+        if size is None:
+            size = self._cursor.arraysize
+        start = time.time()
+        rows = self._cursor.fetchmany(size)
+        self._fetched(start, rows)
+        return rows
+
+    def _fetchall(self):
+        start = time.time()
+        rows = self._cursor.fetchall()
+        self._fetched(start, rows)
+        return rows
+
+    def fetch_columns(self, use_numpy=None):
+        """
+        Returns the remaining rows as one typed array per column; see
+        mysql_oursql.standard.columnar.
+        """
+        return columnar.fetch_columns(self, use_numpy)
+
+    def close(self):
+        self._release_statement()
+        self._cursor.close()
+
     def __getattr__(self, attr):
-        if attr in self.__dict__:
-            return self.__dict__[attr]
-        else:
-            return getattr(self.cursor, attr)
+        return getattr(self._cursor, attr)
 
     def __iter__(self):
-        return iter(self.cursor)
+        return iter(self._cursor)
+
+class StreamingCursorWrapper(CursorWrapper):
+    """
+    A CursorWrapper which hands rows out as oursql reads them from the
+    server instead of collecting a whole chunk or result set first, so
+    iterating over a huge query uses a constant amount of memory.
+
+    As with any unbuffered result, the rows must be read (or the cursor
+    closed) before the connection is used for another query.
+    """
+    __slots__ = ('_rows',)
+
+    def __init__(self, cursor, db=None):
+        self._rows = None
+        super(StreamingCursorWrapper, self).__init__(cursor, db)
+
+    def _bind(self):
+        # Rows always come from the shared iterator, so the fetch methods
+        # can't be handed straight to the cursor. That iterator belongs to
+        # the cursor it was made from, and so is dropped when it's swapped,
+        # e.g. for a cached result.
+        self._rows = None
+        self._observed = bool(listeners)
+        self.fetchone = self._fetchone
+        self.fetchmany = self._fetchmany
+        self.fetchall = self._fetchall
+
+    def _execute(self, query, args, kwargs, retry=True, attempt=0):
+        self._rows = None
+        return super(StreamingCursorWrapper, self)._execute(query, args, kwargs, retry, attempt)
+
+    def executemany(self, query, args, **kwargs):
+        self._rows = None
+        return super(StreamingCursorWrapper, self).executemany(query, args, **kwargs)
+
+    def _row_iter(self):
+        if self._rows is None:
+            self._rows = iter(self._cursor)
+        return self._rows
+
+    def _fetchone(self):
+        if not listeners:
+            return next(self._row_iter(), None)
+        start = time.time()
+        row = next(self._row_iter(), None)
+        self._fetched(start, row is not None and [row] or [])
+        return row
+
+    def _fetchmany(self, size=None):
+        if size is None:
+            size = self._cursor.arraysize
+        start = time.time()
+        rows = list(islice(self._row_iter(), size))
+        if listeners:
+            self._fetched(start, rows)
+        return rows
+
+    def _fetchall(self):
+        start = time.time()
+        rows = list(self._row_iter())
+        if listeners:
+            self._fetched(start, rows)
+        return rows
+
+    def __iter__(self):
+        return self._row_iter()
 
 class DatabaseFeatures(BaseDatabaseFeatures):
     empty_fetchmany_value = []
@@ -123,74 +561,479 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         'iendswith': 'LIKE %s',
     }
 
+    # The classes cursor() wraps oursql's cursors in, normally and when
+    # streaming.
+    cursor_wrapper = CursorWrapper
+    streaming_cursor_wrapper = StreamingCursorWrapper
+
+    # Keys in OPTIONS which configure this backend rather than oursql itself.
+    backend_options = ('bulk_introspection', 'flush', 'health_check',
+                       'init_command', 'isolation_level', 'pool', 'replicas',
+                       'replica_routing', 'result_cache', 'retry', 'sql_mode',
+                       'statement_cache', 'streaming', 'time_zone')
+
     def __init__(self, *args, **kwargs):
         super(DatabaseWrapper, self).__init__(*args, **kwargs)
 
         self.server_version = None
+        self.last_used = None
+        # Whether anything has been written in the current transaction.
+        self.uncommitted_writes = False
+        self._pool = None
+        self._server_key = None
+        self.connection_state = {}
+        self._streaming = self.settings_dict['OPTIONS'].get('streaming', False)
+        self.replica_set = None
+        self.replica_connection = None
+        self._replica_index = None
+        self._pinned_to_primary = False
+        self.retry_policy = None
+        retry = self.settings_dict['OPTIONS'].get('retry')
+        if retry:
+            self.retry_policy = RetryPolicy(**(retry is not True and retry or {}))
+        self.write_tracker = None
+        if self.settings_dict['OPTIONS'].get('flush') == 'delete':
+            self.write_tracker = WriteTracker()
+        self.result_cache = None
+        if self.settings_dict['OPTIONS'].get('result_cache'):
+            self.result_cache = caching.ConnectionResultCache(self.settings_dict, self.alias)
+        if self.settings_dict['OPTIONS'].get('replicas'):
+            self.replica_set = replicas.get_replica_set(self.alias,
+                self.settings_dict['OPTIONS']['replicas'],
+                self.settings_dict['OPTIONS'].get('replica_routing', {}))
         self.features = DatabaseFeatures(self)
-        self.ops = DatabaseOperations()
+        self.ops = DatabaseOperations(self)
         self.client = DatabaseClient(self)
         self.creation = DatabaseCreation(self)
         self.introspection = DatabaseIntrospection(self)
         self.validation = DatabaseValidation(self)
 
+    def _health_check_needed(self):
+        """
+        Decides whether an existing connection should be pinged before it is
+        handed out, according to ``OPTIONS['health_check']``:
+
+        - ``'always'`` (the default) pings on every cursor request.
+        - ``'never'`` skips the ping; reads which hit a dropped connection
+          are retried once on a fresh one instead.
+        - A number of seconds pings only if the connection has been idle for
+          longer than that.
+        """
+        policy = self.settings_dict['OPTIONS'].get('health_check', 'always')
+        if policy == 'always':
+            return True
+        if policy == 'never':
+            return False
+        if self.last_used is None:
+            return True
+        return time.time() - self.last_used > policy
+
     def _valid_connection(self):
         if self.connection is not None:
+            if not self._health_check_needed():
+                return True
             try:
                 self.connection.ping()
                 return True
             except DatabaseError:
-                self.connection.close()
-                self.connection = None
+                self._discard_connection()
         return False
 
+    def get_connection_params(self, host=None):
+        """
+        Returns the keyword arguments to pass to oursql.connect(). ``host``
+        may be a dictionary of ``HOST``, ``PORT``, ``USER`` and ``PASSWORD``
+        settings to use instead of the primary's, e.g. for a replica.
+        """
+        kwargs = {
+            'charset': 'utf8',
+            'use_unicode': True,
+        }
+        settings_dict = self.settings_dict
+        if host:
+            settings_dict = settings_dict.copy()
+            settings_dict.update(host)
+        if settings_dict['USER']:
+            kwargs['user'] = settings_dict['USER']
+        if settings_dict['NAME']:
+            kwargs['db'] = settings_dict['NAME']
+        if settings_dict['PASSWORD']:
+            kwargs['passwd'] = settings_dict['PASSWORD']
+        if settings_dict['HOST'].startswith('/'):
+            kwargs['unix_socket'] = settings_dict['HOST']
+        elif settings_dict['HOST']:
+            kwargs['host'] = settings_dict['HOST']
+        if settings_dict['PORT']:
+            kwargs['port'] = int(settings_dict['PORT'])
+        opts = settings_dict['OPTIONS']
+        if 'autoreconnect' in opts:
+            kwargs['autoreconnect'] = opts['autoreconnect']
+        # We need the number of potentially affected rows after an
+        # "UPDATE", not the number of changed rows.
+        kwargs['found_rows'] = True
+        kwargs.update([(k, v) for k, v in opts.items() if k not in self.backend_options])
+        return kwargs
+
+    @classmethod
+    def _new_connection(cls, params):
+        connection = Database.connect(**params)
+        # XXX: oursql does not have encoders like mysqldb -- unknown if this is still needed
+        # self.connection.encoders[SafeUnicode] = self.connection.encoders[unicode]
+        # self.connection.encoders[SafeString] = self.connection.encoders[str]
+        connection_created.send(sender=cls)
+        return connection
+
+    def get_pool(self):
+        """
+        Returns the shared connection pool configured by ``OPTIONS['pool']``
+        for the current connection parameters, or None if pooling is
+        disabled. It's looked up afresh every time, since the test runner
+        changes ``NAME`` after the first connection has been made.
+        """
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return None
+        if options is True:
+            options = {}
+        params = self.get_connection_params()
+        new_connection = self.__class__._new_connection
+        return pool.get_pool(params, lambda: new_connection(params), options)
+
+    def _server_capabilities(self):
+        """
+        Returns the version and limits of the server, which are looked up
+        once per process for each host rather than for each connection.
+        """
+        if self._server_key is None:
+            params = self.get_connection_params()
+            self._server_key = (params.get('host'), params.get('port'), params.get('unix_socket'))
+        capabilities = server_capabilities.get(self._server_key)
+        if capabilities is None:
+            if not self._valid_connection():
+                self.cursor()
+            m = server_version_re.match(self.connection.server_info)
+            if not m:
+                raise Exception('Unable to determine MySQL version from version string %r' % self.connection.server_info)
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute('SELECT @@max_allowed_packet, @@max_prepared_stmt_count', plain_query=True)
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+            capabilities = server_capabilities[self._server_key] = {
+                'version': tuple([int(x) for x in m.groups()]),
+                'max_allowed_packet': int(row[0]),
+                'max_prepared_stmt_count': int(row[1]),
+            }
+        return capabilities
+
+    def get_max_allowed_packet(self):
+        return self._server_capabilities()['max_allowed_packet']
+
+    def _isolation_variable(self, connection):
+        # MySQL 5.7.20 added transaction_isolation, and 8.0 dropped the
+        # tx_isolation it replaced; MariaDB has always had tx_isolation.
+        m = server_version_re.match(connection.server_info)
+        if m and 'MariaDB' not in connection.server_info and \
+                tuple([int(x) for x in m.groups()]) >= (5, 7, 20):
+            return 'transaction_isolation'
+        return 'tx_isolation'
+
+    def _session_settings(self, connection):
+        """
+        Returns the session variables given in ``OPTIONS`` as a list of
+        (name, value) pairs.
+        """
+        opts = self.settings_dict['OPTIONS']
+        settings = []
+        for name in ('sql_mode', 'time_zone'):
+            if opts.get(name) is not None:
+                settings.append((name, opts[name]))
+        if opts.get('isolation_level'):
+            settings.append((self._isolation_variable(connection),
+                             opts['isolation_level'].upper().replace(' ', '-')))
+        return settings
+
+    def _apply_session(self, connection, state):
+        """
+        Brings the session variables of ``connection`` in line with
+        ``OPTIONS``, in a single SET statement, and runs
+        ``OPTIONS['init_command']``. What has been applied is recorded in
+        ``state`` so that a pooled connection is only changed when it needs
+        to be.
+        """
+        session = state.setdefault('session', {})
+        changes = [(name, value) for name, value in self._session_settings(connection)
+                   if session.get(name) != value]
+        init_command = self.settings_dict['OPTIONS'].get('init_command')
+        if init_command == session.get('init_command'):
+            init_command = None
+        if not changes and not init_command:
+            return
+        cursor = connection.cursor()
+        try:
+            if changes:
+                cursor.execute('SET SESSION %s' % ', '.join(['%s = ?' % name for name, value in changes]),
+                               [value for name, value in changes])
+                session.update(changes)
+            if init_command:
+                cursor.execute(init_command, plain_query=True)
+                session['init_command'] = init_command
+        finally:
+            cursor.close()
+
+    def get_statement_cache(self):
+        """
+        Returns the prepared statement cache for the current connection, or
+        None unless ``OPTIONS['statement_cache']`` gives it a size.
+        """
+        statements = self.connection_state.get('statements')
+        if statements is None:
+            size = self.settings_dict['OPTIONS'].get('statement_cache')
+            if not size or self.connection is None:
+                return None
+            # The server-wide limit is shared by every connection, but it's
+            # the most any single connection could possibly hold.
+            size = min(size, self._server_capabilities()['max_prepared_stmt_count'])
+            statements = self.connection_state['statements'] = StatementCache(self.connection, size)
+        return statements
+
+    def open_connection(self, params=None, state=None):
+        """
+        Opens a new connection, outside of any pool, with the session
+        settings in ``OPTIONS`` applied. Every connection the backend makes
+        for itself, such as those of replicas, AsyncDatabase's workers and
+        prefetching scans, goes through here. ``params`` defaults to the
+        primary's.
+        """
+        if params is None:
+            params = self.get_connection_params()
+        if state is None:
+            state = {}
+        connection = self._new_connection(params)
+        try:
+            self._apply_session(connection, state)
+        except Database.Error:
+            try:
+                connection.close()
+            except Database.Error:
+                pass
+            raise
+        return connection
+
+    def _connect(self):
+        self.uncommitted_writes = False
+        # The pool the connection came from, which it must be returned to.
+        self._pool = connection_pool = self.get_pool()
+        if connection_pool is None:
+            self.connection_state = {}
+            self.connection = self.open_connection(state=self.connection_state)
+            return
+        self.connection = connection_pool.checkout()
+        self.connection_state = connection_pool.state(self.connection)
+        try:
+            self._apply_session(self.connection, self.connection_state)
+        except Database.Error:
+            self._discard_connection()
+            raise
+
+    def _discard_connection(self):
+        connection, self.connection = self.connection, None
+        self.connection_state = {}
+        if self._pool is not None:
+            self._pool.discard(connection)
+        else:
+            try:
+                connection.close()
+            except Database.Error:
+                pass
+
+    def reconnect(self):
+        """
+        Throws away the current connection, which is assumed to be broken,
+        and opens a new one.
+        """
+        if self.connection is not None:
+            self._discard_connection()
+        self._connect()
+        return self.connection
+
+    def retry_transaction(self, func):
+        """
+        Decorator which runs ``func`` in a transaction, committed on success,
+        and runs the whole thing again if it fails on a deadlock or lock wait
+        timeout::
+
+            @connection.retry_transaction
+            def transfer(source, target, amount):
+                ...
+
+        Uses ``OPTIONS['retry']``, or the default RetryPolicy if that isn't
+        set. Called inside an enclosing managed transaction, ``func`` becomes
+        part of it and so is run only once: a deadlock has rolled back the
+        enclosing transaction's earlier work too, so only the outermost
+        block can be retried.
+        """
+        def inner(*args, **kwargs):
+            if transaction.is_managed(using=self.alias):
+                return func(*args, **kwargs)
+            policy = self.retry_policy or RetryPolicy()
+            attempt = 0
+            while True:
+                try:
+                    return transaction.commit_on_success(using=self.alias)(func)(*args, **kwargs)
+                except Database.OperationalError, e:
+                    if not policy.should_retry(e, attempt):
+                        raise
+                    attempt += 1
+        return wraps(func)(inner)
+
+    def bulk_load(self, table, columns, rows, chunk_size=100000):
+        """
+        Loads ``rows``, an iterable of sequences of values for ``columns``,
+        into ``table`` with LOAD DATA LOCAL INFILE and returns the number of
+        rows loaded; see mysql_oursql.standard.loading.
+        """
+        return loading.bulk_load(self, table, columns, rows, chunk_size)
+
+    def batch(self):
+        """
+        Returns a Batch which collects statements and runs them in as few
+        round trips as it can; see mysql_oursql.standard.batching.
+        """
+        from mysql_oursql.standard.batching import Batch
+        return Batch(self)
+
+    def scan(self, table, columns=None, pk='id', chunk_size=1000, where=None,
+             params=(), prefetch=False):
+        """
+        Yields the rows of ``table`` in chunks, paging by primary key rather
+        than by offset; see mysql_oursql.standard.scanning.
+        """
+        return scanning.scan(self, table, columns, pk, chunk_size, where, params, prefetch)
+
+    def replica_cursor(self, query):
+        """
+        Returns a cursor on a healthy replica if ``query`` can be sent to
+        one, or None if it should run on the primary.
+
+        Only plain SELECTs outside of managed transactions go to replicas.
+        Once anything has been written, every query until the connection is
+        closed goes to the primary so that it sees its own writes.
+        """
+        if self._pinned_to_primary:
+            return None
+        if not replicas.is_replica_safe(query):
+            if not read_query_re.match(query):
+                self.pin_to_primary()
+            return None
+        if transaction.is_managed(using=self.alias):
+            return None
+        replica_set = self.replica_set
+        if self.replica_connection is not None:
+            if not replica_set.needs_check(self._replica_index) or \
+                    replica_set.check(self._replica_index, self.replica_connection):
+                return self.replica_connection.cursor()
+            self._close_replica()
+        failed = []
+        while True:
+            index = replica_set.choose(exclude=failed)
+            if index is None:
+                return None
+            try:
+                connection = self.open_connection(
+                    self.get_connection_params(replica_set.replicas[index]))
+            except Database.Error:
+                replica_set.mark(index, False)
+                replica_set.release(index)
+                failed.append(index)
+                continue
+            self.replica_connection, self._replica_index = connection, index
+            if replica_set.needs_check(index) and not replica_set.check(index, connection):
+                self._close_replica()
+                failed.append(index)
+                continue
+            return connection.cursor()
+
+    def pin_to_primary(self):
+        """
+        Sends every query to the primary until the connection is closed,
+        once something has been written through it.
+        """
+        self._pinned_to_primary = True
+
+    def replica_failed(self):
+        "Takes the current replica out of rotation after an error."
+        if self.replica_connection is not None:
+            self.replica_set.mark(self._replica_index, False)
+            self._close_replica()
+
+    def _close_replica(self):
+        connection, self.replica_connection = self.replica_connection, None
+        self.replica_set.release(self._replica_index)
+        self._replica_index = None
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def close(self):
+        if self.replica_connection is not None:
+            self._close_replica()
+        self._pinned_to_primary = False
+        if self.connection is not None and self._pool is not None:
+            connection, self.connection = self.connection, None
+            self._pool.checkin(connection)
+        else:
+            super(DatabaseWrapper, self).close()
+        self.connection_state = {}
+
     def _cursor(self):
         if not self._valid_connection():
-            kwargs = {
-                'charset': 'utf8',
-                'use_unicode': True,
-            }
-            settings_dict = self.settings_dict
-            if settings_dict['USER']:
-                kwargs['user'] = settings_dict['USER']
-            if settings_dict['NAME']:
-                kwargs['db'] = settings_dict['NAME']
-            if settings_dict['PASSWORD']:
-                kwargs['passwd'] = settings_dict['PASSWORD']
-            if settings_dict['HOST'].startswith('/'):
-                kwargs['unix_socket'] = settings_dict['HOST']
-            elif settings_dict['HOST']:
-                kwargs['host'] = settings_dict['HOST']
-            if settings_dict['PORT']:
-                kwargs['port'] = int(settings_dict['PORT'])
-            opts = settings_dict['OPTIONS']
-            if 'autoreconnect' in opts:
-                kwargs['autoreconnect'] = opts['autoreconnect']
-            # We need the number of potentially affected rows after an
-            # "UPDATE", not the number of changed rows.
-            kwargs['found_rows'] = True
-            # TODO: support for 'init_command'
-            kwargs.update(settings_dict['OPTIONS'])
-            self.connection = Database.connect(**kwargs)
-            # XXX: oursql does not have encoders like mysqldb -- unknown if this is still needed
-            # self.connection.encoders[SafeUnicode] = self.connection.encoders[unicode]
-            # self.connection.encoders[SafeString] = self.connection.encoders[str]
-            connection_created.send(sender=self.__class__)
-        cursor = CursorWrapper(self.connection.cursor())
+            self._connect()
+        self.last_used = time.time()
+        if self._streaming:
+            cursor = self.streaming_cursor_wrapper(self.connection.cursor(), self)
+        else:
+            cursor = self.cursor_wrapper(self.connection.cursor(), self)
         return cursor
 
+    @contextmanager
+    def streaming(self):
+        """
+        Makes cursors created inside the block stream their results, e.g.::
+
+            with connection.streaming():
+                for obj in Model.objects.iterator():
+                    ...
+
+        ``OPTIONS['streaming']`` turns this on for every cursor, which is
+        mostly useful for settings used by management commands.
+        """
+        previous, self._streaming = self._streaming, True
+        try:
+            yield self
+        finally:
+            self._streaming = previous
+
+    def _commit(self):
+        try:
+            return BaseDatabaseWrapper._commit(self)
+        finally:
+            self.uncommitted_writes = False
+            if self.result_cache is not None:
+                self.result_cache.transaction_ended()
+
     def _rollback(self):
         try:
             BaseDatabaseWrapper._rollback(self)
         except Database.NotSupportedError:
             pass
+        self.uncommitted_writes = False
+        if self.result_cache is not None:
+            self.result_cache.transaction_ended()
 
     def get_server_version(self):
         if not self.server_version:
-            if not self._valid_connection():
-                self.cursor()
-            m = server_version_re.match(self.connection.server_info)
-            if not m:
-                raise Exception('Unable to determine MySQL version from version string %r' % self.connection.server_info)
-            self.server_version = tuple([int(x) for x in m.groups()])
+            self.server_version = self._server_capabilities()['version']
         return self.server_version
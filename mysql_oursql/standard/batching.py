@@ -0,0 +1,97 @@
+"""
+Running a batch of independent statements in as few round trips as oursql
+allows.
+
+    with connection.batch() as batch:
+        batch.add("INSERT INTO audit (action) VALUES (%s)", ['login'])
+        batch.add("INSERT INTO audit (action) VALUES (%s)", ['logout'])
+        batch.add("UPDATE counters SET hits = hits + 1 WHERE id = %s", [7])
+    batch.rowcounts     # [1, 1, 1]
+
+oursql can neither open a connection with multi-statement support nor read
+more than one result per query, so statements can't simply be sent
+together. Instead each run of consecutive single-row INSERTs of the same SQL
+goes through executemany(), which sends it as multi-row INSERTs as large as
+``max_allowed_packet`` allows; anything else is executed on its own.
+
+A multi-row INSERT only reports how many rows it inserted altogether, so
+every statement of a run gets a rowcount of 1 if all of its rows were
+inserted and None otherwise, as can happen with INSERT IGNORE.
+
+If a statement fails, its exception has ``batch_index`` and
+``batch_statement`` set to say which, and ``rowcounts`` holds those of the
+statements which ran before it. For a run of INSERTs that is the first of
+the run, some of whose rows may already have been inserted if it needed
+more than one multi-row INSERT.
+"""
+
+import sys
+
+from mysql_oursql.standard.base import insert_values_re, rewrite_query
+
+def _runs(statements):
+    """
+    Groups ``statements`` into ``(index, sql, params_list)`` runs, merging
+    consecutive single-row INSERTs of the same SQL.
+    """
+    runs = []
+    for index, (sql, params) in enumerate(statements):
+        if runs and runs[-1][1] == sql and insert_values_re.match(rewrite_query(sql)):
+            runs[-1][2].append(params)
+        else:
+            runs.append((index, sql, [params]))
+    return runs
+
+class Batch(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+        self.rowcounts = None
+
+    def add(self, sql, params=()):
+        "Queues ``sql``, with Django-style ``%s`` placeholders for ``params``."
+        self.statements.append((sql, params))
+
+    def __len__(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.execute()
+
+    def execute(self):
+        """
+        Runs the queued statements and returns the rowcount of each.
+        """
+        statements, self.statements = self.statements, []
+        self.rowcounts = []
+        if not statements:
+            return self.rowcounts
+        cursor = self.connection.cursor()
+        try:
+            for index, sql, params_list in _runs(statements):
+                try:
+                    if len(params_list) == 1:
+                        cursor.execute(sql, params_list[0])
+                    else:
+                        cursor.executemany(sql, params_list)
+                except Exception:
+                    self._failed(index, sql)
+                if len(params_list) == 1:
+                    self.rowcounts.append(cursor.rowcount)
+                else:
+                    each = cursor.rowcount == len(params_list) and 1 or None
+                    self.rowcounts.extend([each] * len(params_list))
+        finally:
+            cursor.close()
+        return self.rowcounts
+
+    def _failed(self, index, sql):
+        error, tb = sys.exc_info()[1:]
+        error.batch_index = index
+        error.batch_statement = sql
+        error.rowcounts = self.rowcounts
+        raise error, None, tb
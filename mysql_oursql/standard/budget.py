@@ -0,0 +1,170 @@
+"""
+Query budgets and N+1 detection.
+
+A QueryBudget watches the queries run by the current thread while it is
+active and reports those which go over its limits:
+
+    max_queries     statements executed
+    max_time        seconds spent in the database, fetches included
+    max_repeats     statements of the same shape (see
+                    instrumentation.fingerprint), the sign of an N+1 loop
+
+Each violation is logged to ``mysql_oursql.budget`` with the stack of the
+query which crossed the limit or, with ``raise_errors=True`` as in tests,
+raised as QueryBudgetExceeded when the budget is stopped::
+
+    with QueryBudget(max_queries=10, max_repeats=3, raise_errors=True):
+        response = client.get('/dashboard/')
+
+QueryBudgetMiddleware does the same for every request, with the limits in
+``settings.OURSQL_QUERY_BUDGET``. Budgets are built on the instrumentation
+listeners, so while none is active queries cost nothing extra.
+"""
+
+import logging
+import os
+import threading
+import traceback
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from mysql_oursql.standard import instrumentation
+
+logger = logging.getLogger('mysql_oursql.budget')
+
+# Frames from inside the backend are left out of reported stacks.
+_package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+_local = threading.local()
+_active = [0]
+_active_lock = threading.Lock()
+
+def _dispatch(event):
+    for budget in getattr(_local, 'budgets', ()):
+        budget.record(event)
+
+def _caller_stack():
+    return [frame for frame in traceback.extract_stack()
+            if not os.path.abspath(frame[0]).startswith(_package_dir)]
+
+class QueryBudget(object):
+    def __init__(self, max_queries=None, max_time=None, max_repeats=None,
+                 alias=None, raise_errors=False, name=None):
+        self.max_queries = max_queries
+        self.max_time = max_time
+        self.max_repeats = max_repeats
+        self.alias = alias
+        self.raise_errors = raise_errors
+        self.name = name
+        self.queries = 0
+        self.time = 0.0
+        self.repeats = {}
+        self.violations = []
+
+    def start(self):
+        budgets = getattr(_local, 'budgets', None)
+        if budgets is None:
+            budgets = _local.budgets = []
+        budgets.append(self)
+        _active_lock.acquire()
+        try:
+            _active[0] += 1
+            if _active[0] == 1:
+                instrumentation.register(_dispatch)
+        finally:
+            _active_lock.release()
+
+    def stop(self):
+        """
+        Stops watching queries and, with ``raise_errors``, raises
+        QueryBudgetExceeded if any limit was broken.
+        """
+        _local.budgets.remove(self)
+        _active_lock.acquire()
+        try:
+            _active[0] -= 1
+            if _active[0] == 0:
+                instrumentation.unregister(_dispatch)
+        finally:
+            _active_lock.release()
+        if self.raise_errors and self.violations:
+            raise QueryBudgetExceeded(self.report())
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.stop()
+        else:
+            # Don't hide the exception already on its way out.
+            try:
+                self.stop()
+            except QueryBudgetExceeded:
+                pass
+
+    def record(self, event):
+        if self.alias is not None and event.alias != self.alias:
+            return
+        over_time = self.max_time is not None and self.time > self.max_time
+        self.time += event.duration
+        if not over_time and self.max_time is not None and self.time > self.max_time:
+            self._violation('spent %.3fs in the database, over the budget of %.3fs' %
+                            (self.time, self.max_time))
+        if event.kind == 'fetch':
+            return
+        self.queries += 1
+        if self.max_queries is not None and self.queries == self.max_queries + 1:
+            self._violation('ran more than %d queries' % self.max_queries)
+        if self.max_repeats is not None:
+            fingerprint = event.fingerprint
+            repeats = self.repeats[fingerprint] = self.repeats.get(fingerprint, 0) + 1
+            if repeats == self.max_repeats + 1:
+                self._violation('ran the same query more than %d times, possibly an N+1 '
+                                'loop: %s' % (self.max_repeats, fingerprint))
+
+    def _violation(self, message):
+        if self.name:
+            message = '%s %s' % (self.name, message)
+        stack = ''.join(traceback.format_list(_caller_stack()))
+        self.violations.append((message, stack))
+        if not self.raise_errors:
+            logger.warning('%s\n%s', message, stack)
+
+    def report(self):
+        return '\n\n'.join(['%s\n%s' % violation for violation in self.violations])
+
+class QueryBudgetMiddleware(object):
+    """
+    Checks every request against a QueryBudget created with the keyword
+    arguments in ``settings.OURSQL_QUERY_BUDGET``.
+    """
+    def __init__(self):
+        self.options = getattr(settings, 'OURSQL_QUERY_BUDGET', None)
+        if not self.options:
+            raise MiddlewareNotUsed
+
+    def process_request(self, request):
+        budget = request._query_budget = QueryBudget(name=request.path, **self.options)
+        budget.start()
+
+    def _finish(self, request):
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None:
+            del request._query_budget
+            budget.stop()
+
+    def process_response(self, request, response):
+        self._finish(request)
+        return response
+
+    def process_exception(self, request, exception):
+        try:
+            self._finish(request)
+        except QueryBudgetExceeded:
+            pass
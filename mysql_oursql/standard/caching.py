@@ -0,0 +1,285 @@
+"""
+Caching the results of SELECTs on tables which rarely change.
+
+Configured with ``OPTIONS['result_cache']``, a dictionary which may contain:
+
+    tables          the tables whose queries may be cached; a query is only
+                    cached if every table it reads is listed (required)
+    ttl             seconds a result is kept for (default 60)
+    max_rows        results with more rows than this aren't cached, and are
+                    read straight from the server past the first
+                    ``max_rows + 1`` (default 1000)
+    storage         'local' (the default) for an LRU cache shared by the
+                    threads of this process, 'django' for Django's cache
+                    backend, or any object with Django's ``get``,
+                    ``get_many`` and ``set`` methods
+    max_size        entries kept by the 'local' storage (default 1000)
+
+Every table carries a token which is part of the key of each result read
+from it. Writes to a table through the backend replace its token, which
+invalidates every cached result involving it without having to find them;
+they're replaced again when the transaction ends, in case another process
+cached the old rows in the meantime. Writes made any other way are only
+noticed once ``ttl`` runs out.
+"""
+
+import hashlib
+import re
+import threading
+import time
+import uuid
+from itertools import chain, islice
+
+from django.db import transaction
+
+from mysql_oursql.standard.tracking import UNKNOWN, parse_write
+from mysql_oursql.standard.utils import LRUCache
+
+select_query_re = re.compile(r'^\s*SELECT\b', re.I)
+# Reads whose result depends on more than the tables' contents.
+uncacheable_re = re.compile(r'\bFOR\s+UPDATE\b|\bLOCK\s+IN\s+SHARE\s+MODE\b|\bSQL_NO_CACHE\b|'
+                            r'\b(?:NOW|SYSDATE|CURDATE|CURTIME|CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|'
+                            r'UNIX_TIMESTAMP|UTC_DATE|UTC_TIME|UTC_TIMESTAMP|RAND|UUID|CONNECTION_ID|'
+                            r'LAST_INSERT_ID|FOUND_ROWS|USER|DATABASE)\s*\(|@', re.I)
+table_re = re.compile(r'\b(?:FROM|JOIN)\s+(`[^`]+`|\w+)((?:\s*,\s*(?:`[^`]+`|\w+))*)', re.I)
+
+def read_tables(query):
+    """
+    Returns the set of tables named in the FROM and JOIN clauses of a
+    SELECT, or None if it isn't one whose result may be cached.
+    """
+    if not select_query_re.match(query) or uncacheable_re.search(query):
+        return None
+    tables = set()
+    for first, rest in table_re.findall(query):
+        for name in [first] + rest.split(',')[1:]:
+            tables.add(name.strip().strip('`'))
+    return tables or None
+
+class LocalStorage(object):
+    "An LRU cache with per-entry expiry, in the style of Django's cache API."
+    def __init__(self, max_size=1000):
+        self._cache = LRUCache(maxsize=max_size)
+
+    def get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.time():
+            self._cache.pop(key)
+            return None
+        return value
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=None):
+        self._cache.set(key, (timeout is not None and time.time() + timeout or None, value))
+
+class CachedCursor(object):
+    """
+    Stands in for a cursor while a cached result is read, so that
+    CursorWrapper can swap it in just like any other cursor.
+
+    ``rest``, if given, is the cursor the result was being read from, for
+    one too big to cache: its remaining rows follow ``rows``.
+    """
+    lastrowid = None
+
+    def __init__(self, description, rows, rowcount, rest=None):
+        self.description = description
+        self.rowcount = rowcount
+        self.arraysize = 1
+        self.rest = rest
+        self._rows = iter(rows)
+        if rest is not None:
+            self._rows = chain(self._rows, iter(rest))
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=None):
+        return list(islice(self._rows, size or self.arraysize))
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        self._rows = iter(())
+
+class ResultCache(object):
+    """
+    The cached results of one database, shared by every connection to it in
+    the process.
+    """
+    def __init__(self, prefix, tables, ttl=60, max_rows=1000, storage='local', max_size=1000):
+        self.prefix = prefix
+        self.tables = frozenset(tables)
+        self.ttl = ttl
+        self.max_rows = max_rows
+        if storage == 'local':
+            storage = LocalStorage(max_size)
+        elif storage == 'django':
+            from django.core.cache import cache
+            storage = cache
+        self.storage = storage
+        self._parsed = LRUCache(maxsize=1024)
+
+    def _tables(self, query):
+        tables = self._parsed.get(query)
+        if tables is None:
+            tables = read_tables(query)
+            if tables is None or not tables <= self.tables:
+                tables = ()
+            else:
+                tables = tuple(sorted(tables))
+            self._parsed.set(query, tables)
+        return tables
+
+    def _token_key(self, table):
+        return '%s:table:%s' % (self.prefix, table)
+
+    def _new_token(self, table):
+        token = uuid.uuid4().hex
+        self.storage.set(self._token_key(table), token)
+        return token
+
+    def key(self, query, args):
+        """
+        Returns the key ``query`` run with ``args`` is cached under, or None
+        if it can't be cached.
+        """
+        tables = self._tables(query)
+        if not tables:
+            return None
+        keys = [self._token_key(table) for table in tables]
+        found = self.storage.get_many(keys)
+        tokens = []
+        for table, key in zip(tables, keys):
+            token = found.get(key)
+            if token is None:
+                token = self._new_token(table)
+            tokens.append(token)
+        digest = hashlib.md5(repr((query, tuple(args), tokens))).hexdigest()
+        return '%s:result:%s' % (self.prefix, digest)
+
+    def get(self, key):
+        "Returns a cursor over the cached result for ``key``, or None."
+        result = self.storage.get(key)
+        if result is None:
+            return None
+        return CachedCursor(*result)
+
+    def set(self, key, cursor):
+        """
+        Reads ``cursor``'s result and caches it under ``key``, or reads no
+        more than ``max_rows + 1`` rows if it's too big to cache, and returns
+        a cursor to read it from instead.
+        """
+        description, rows = cursor.description, cursor.fetchmany(self.max_rows + 1)
+        rowcount = cursor.rowcount
+        if len(rows) > self.max_rows:
+            return CachedCursor(description, rows, rowcount, rest=cursor)
+        self.storage.set(key, (description, rows, rowcount), self.ttl)
+        return CachedCursor(description, rows, rowcount)
+
+    def invalidate(self, tables=None):
+        "Drops every result read from ``tables``, or from any table."
+        if tables is None:
+            tables = self.tables
+        for table in tables:
+            if table in self.tables:
+                self._new_token(table)
+
+def cache_prefix(settings_dict):
+    "Returns the prefix of the keys of the database ``settings_dict`` names."
+    return 'oursql:%s' % hashlib.md5(repr((settings_dict['HOST'], settings_dict['PORT'],
+                                           settings_dict['NAME']))).hexdigest()
+
+class ConnectionResultCache(object):
+    """
+    A connection's view of its database's ResultCache, which also tracks
+    the tables written to in its current transaction.
+
+    The ResultCache is looked up by the connection's current settings,
+    since the test runner switches ``NAME`` to the test database after the
+    connection has been created.
+    """
+    def __init__(self, settings_dict, alias):
+        self.settings_dict = settings_dict
+        self.alias = alias
+        self.written = set()
+        self._all_written = False
+        self._parsed = LRUCache(maxsize=1024)
+        self._database = None
+        self._results = None
+
+    @property
+    def results(self):
+        settings_dict = self.settings_dict
+        database = (settings_dict['HOST'], settings_dict['PORT'], settings_dict['NAME'])
+        if database != self._database:
+            self._results = get_result_cache(cache_prefix(settings_dict),
+                                             settings_dict['OPTIONS']['result_cache'])
+            self._database = database
+        return self._results
+
+    def key(self, query, args):
+        # Inside a transaction reads may see its own uncommitted writes.
+        if transaction.is_managed(using=self.alias):
+            return None
+        return self.results.key(query, args)
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def set(self, key, cursor):
+        return self.results.set(key, cursor)
+
+    def record(self, query):
+        parsed = self._parsed.get(query)
+        if parsed is None:
+            parsed = parse_write(query)
+            self._parsed.set(query, parsed or ())
+        if not parsed:
+            return
+        if parsed is UNKNOWN:
+            self._all_written = True
+            self.results.invalidate()
+        elif parsed[0] in self.results.tables:
+            self.written.add(parsed[0])
+            self.results.invalidate([parsed[0]])
+
+    def transaction_ended(self):
+        if self._all_written:
+            self.results.invalidate()
+        elif self.written:
+            self.results.invalidate(self.written)
+        self.written = set()
+        self._all_written = False
+
+_result_caches = {}
+_result_caches_lock = threading.Lock()
+
+def get_result_cache(prefix, options):
+    """
+    Returns the process-wide ResultCache for the database identified by
+    ``prefix``, creating it with ``options`` if it doesn't exist yet.
+    """
+    _result_caches_lock.acquire()
+    try:
+        results = _result_caches.get(prefix)
+        if results is None:
+            results = _result_caches[prefix] = ResultCache(prefix, **options)
+        return results
+    finally:
+        _result_caches_lock.release()
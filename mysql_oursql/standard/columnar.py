@@ -0,0 +1,140 @@
+"""
+Fetching result sets column by column.
+
+fetch_columns() reads the remaining rows of a cursor straight into one
+typed array per column, chosen from the FIELD_TYPE codes in
+cursor.description, instead of returning a list of row tuples:
+
+    integer types       int64, or uint64 (with NumPy) or a list for unsigned
+                        BIGINTs beyond the range of int64
+    DOUBLE, FLOAT       float64
+    DATE, DATETIME,     numpy.datetime64 if NumPy is installed, otherwise a
+    TIMESTAMP           list of datetimes
+    anything else       a list (or NumPy object array) of the values
+
+NULLs are replaced by a zero value (or NaT) and flagged in the column's
+``nulls`` mask. NumPy is used when it is installed unless ``use_numpy`` is
+False; otherwise the standard library's ``array`` module is, or a list
+where it has no 64-bit integer type.
+"""
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from mysql_oursql.constants import FIELD_TYPE
+
+INTEGER_TYPES = frozenset([FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG,
+                           FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR])
+FLOAT_TYPES = frozenset([FIELD_TYPE.DOUBLE, FIELD_TYPE.FLOAT])
+DATETIME_TYPES = frozenset([FIELD_TYPE.DATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP])
+
+# array.array only gained the 'q' (long long) typecode in Python 3.3, and
+# 'l' is only 64 bits wide on 64-bit platforms other than Windows.
+try:
+    array('q')
+    INT64_TYPECODE = 'q'
+except ValueError:
+    INT64_TYPECODE = array('l').itemsize >= 8 and 'l' or None
+
+class Column(object):
+    def __init__(self, name, type_code, values, nulls):
+        self.name = name
+        self.type_code = type_code
+        self.values = values
+        self.nulls = nulls
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return '<Column %s: %d values>' % (self.name, len(self.values))
+
+def _kind(type_code):
+    if type_code in INTEGER_TYPES:
+        return 'int'
+    if type_code in FLOAT_TYPES:
+        return 'float'
+    if type_code in DATETIME_TYPES:
+        return 'datetime'
+    return 'object'
+
+def _builder(kind):
+    if kind == 'int':
+        if INT64_TYPECODE is None:
+            return [], 0
+        return array(INT64_TYPECODE), 0
+    if kind == 'float':
+        return array('d'), 0.0
+    # Values NumPy converts in one go at the end are collected in a list.
+    return [], None
+
+def _finish(kind, values, nulls, use_numpy):
+    if not use_numpy:
+        return values, nulls
+    nulls = numpy.array(nulls, dtype=numpy.bool_)
+    if kind == 'int':
+        try:
+            values = numpy.array(values, dtype=numpy.int64)
+        except OverflowError:
+            # Only unsigned BIGINTs go past the top of int64.
+            values = numpy.array(values, dtype=numpy.uint64)
+    elif kind == 'float':
+        values = numpy.array(values, dtype=numpy.float64)
+    elif kind == 'datetime':
+        values = numpy.array(values, dtype='datetime64[us]')
+    else:
+        values = numpy.array(values, dtype=object)
+    return values, nulls
+
+def fetch_columns(cursor, use_numpy=None):
+    """
+    Reads every remaining row from ``cursor`` and returns a list of Column
+    objects, one per column of cursor.description, in order.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError('NumPy is not installed.')
+    description = cursor.description or ()
+    kinds = [_kind(d[1]) for d in description]
+    builders = [_builder(kind) for kind in kinds]
+    columns = [values for values, empty in builders]
+    appends = [values.append for values in columns]
+    null_masks = [array('b') for d in description]
+    null_appends = [nulls.append for nulls in null_masks]
+    empties = [empty for values, empty in builders]
+    if use_numpy:
+        # NaT for missing datetimes.
+        empties = [kind == 'datetime' and 'NaT' or empty for kind, empty in zip(kinds, empties)]
+    positions = range(len(description))
+
+    size = max(getattr(cursor, 'arraysize', 1), 1000)
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        for row in rows:
+            for i in positions:
+                value = row[i]
+                if value is None:
+                    appends[i](empties[i])
+                    null_appends[i](1)
+                else:
+                    try:
+                        appends[i](value)
+                    except OverflowError:
+                        # An unsigned BIGINT too big for the array.
+                        columns[i] = list(columns[i])
+                        appends[i] = columns[i].append
+                        appends[i](value)
+                    null_appends[i](0)
+
+    result = []
+    for d, kind, values, nulls in zip(description, kinds, columns, null_masks):
+        values, nulls = _finish(kind, values, nulls, use_numpy)
+        result.append(Column(d[0], d[1], values, nulls))
+    return result
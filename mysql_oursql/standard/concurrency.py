@@ -0,0 +1,123 @@
+"""
+Running independent queries concurrently.
+
+AsyncDatabase runs queries on a bounded pool of worker threads, each with
+its own oursql connection opened with the same settings as a Django
+connection, and returns futures for their results::
+
+    from django.db import connections
+    from mysql_oursql.standard.concurrency import AsyncDatabase
+
+    db = AsyncDatabase(connections['default'], max_workers=8)
+    users, orders = db.gather(
+        db.fetchall("SELECT ... FROM users WHERE ...", [...]),
+        db.fetchall("SELECT ... FROM orders WHERE ...", [...]),
+    )
+
+Each statement runs in its own transaction on the worker's connection,
+not in the Django connection's. Writes invalidate ``OPTIONS['result_cache']``
+once committed, but aren't seen by the Django connection's write tracking;
+with ``OPTIONS['flush'] = 'delete'`` the flush finds the tables they touched
+by looking at them, as it does for other processes' writes. Requires
+``concurrent.futures``, which on Python 2 is the ``futures`` package.
+"""
+
+import threading
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError, e:
+    ThreadPoolExecutor = None
+    futures_import_error = e
+
+from django.core.exceptions import ImproperlyConfigured
+
+from mysql_oursql.standard.base import CursorWrapper, Database
+from mysql_oursql.standard.tracking import UNKNOWN, parse_write
+
+class AsyncDatabase(object):
+    def __init__(self, connection, max_workers=4):
+        if ThreadPoolExecutor is None:
+            raise ImproperlyConfigured("Error loading concurrent.futures module: %s" % futures_import_error)
+        self.connection = connection
+        self._params = connection.get_connection_params()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _worker_connection(self):
+        "Returns the connection pinned to the current worker thread."
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.connection.open_connection(self._params)
+            self._lock.acquire()
+            try:
+                self._connections.append(connection)
+            finally:
+                self._lock.release()
+        return connection
+
+    def _run(self, method, query, args):
+        connection = self._worker_connection()
+        # Going through CursorWrapper keeps placeholder rewriting and error
+        # mapping the same as for ordinary Django queries.
+        cursor = CursorWrapper(connection.cursor())
+        try:
+            cursor.execute(query, args)
+            if method == 'execute':
+                result = cursor.rowcount
+            elif method == 'fetchone':
+                result = cursor.fetchone()
+            else:
+                result = cursor.fetchall()
+            connection.commit()
+            self._invalidate(query)
+            return result
+        except:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _invalidate(self, query):
+        "Drops the cached results a committed ``query`` may have changed."
+        result_cache = self.connection.result_cache
+        if result_cache is None:
+            return
+        parsed = parse_write(query)
+        if parsed is UNKNOWN:
+            result_cache.results.invalidate()
+        elif parsed:
+            result_cache.results.invalidate([parsed[0]])
+
+    def _submit(self, method, query, args):
+        return self._executor.submit(self._run, method, query, args)
+
+    def execute(self, query, args=()):
+        "Runs ``query`` in its own transaction; the result is its rowcount."
+        return self._submit('execute', query, args)
+
+    def fetchone(self, query, args=()):
+        return self._submit('fetchone', query, args)
+
+    def fetchall(self, query, args=()):
+        return self._submit('fetchall', query, args)
+
+    def gather(self, *futures):
+        "Waits for the given futures and returns their results in order."
+        return [future.result() for future in futures]
+
+    def close(self):
+        "Waits for running queries and closes every worker connection."
+        self._executor.shutdown(wait=True)
+        self._lock.acquire()
+        try:
+            connections, self._connections = self._connections, []
+        finally:
+            self._lock.release()
+        for connection in connections:
+            try:
+                connection.close()
+            except Database.Error:
+                pass
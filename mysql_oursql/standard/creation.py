@@ -1,8 +1,16 @@
 from django.conf import settings
 from django.db.backends.creation import BaseDatabaseCreation, TEST_DATABASE_PREFIX
+from django.db.backends.util import truncate_name
+from contextlib import contextmanager
+import hashlib
 import sys
 
+TEST_TEMPLATE_PREFIX = 'test_template_'
+
 class DatabaseCreation(BaseDatabaseCreation):
+    # Foreign key clauses held back by deferred_constraints(), by table.
+    _deferred = None
+
     # This dictionary maps Field objects to their associated MySQL column
     # types, as strings. Column-type strings can contain format strings; they'll
     # be interpolated against the values of Field.__dict__ before being output.
@@ -41,7 +49,103 @@ class DatabaseCreation(BaseDatabaseCreation):
     def sql_for_inline_foreign_key_references(self, field, known_models, style):
         "All inline references are pending under MySQL"
         return [], True
-        
+
+    def _sql_alter_table(self, table, clauses, style):
+        qn = self.connection.ops.quote_name
+        return (style.SQL_KEYWORD('ALTER TABLE') + ' ' + style.SQL_TABLE(qn(table)) + ' ' +
+                ', '.join(clauses) + ';')
+
+    @contextmanager
+    def deferred_constraints(self):
+        """
+        Holds back the foreign keys sql_for_pending_references() would add
+        inside the block, such as a syncdb, so that each table gets them in
+        the same ALTER TABLE as its indexes from sql_indexes_for_model().
+        Those of tables without indexes are added at the end of the block,
+        again with one statement per table.
+        """
+        from django.core.management.color import no_style
+        self._deferred = deferred = {}
+        try:
+            yield
+        finally:
+            self._deferred = None
+        if deferred:
+            cursor = self.connection.cursor()
+            for table in sorted(deferred):
+                cursor.execute(self._sql_alter_table(table, deferred[table], no_style()), plain_query=True)
+
+    def sql_for_pending_references(self, model, style, pending_references):
+        """
+        Returns the ALTER TABLE statements adding the foreign keys which
+        reference ``model``, with one statement per referencing table rather
+        than one per constraint, since MySQL rebuilds the table for each.
+        Inside deferred_constraints() they're held back and nothing is
+        returned.
+        """
+        if not model._meta.managed or model._meta.proxy:
+            return []
+        qn = self.connection.ops.quote_name
+        opts = model._meta
+        tables, clauses = [], {}
+        if model in pending_references:
+            for rel_class, f in pending_references[model]:
+                r_table = rel_class._meta.db_table
+                r_col = f.column
+                table = opts.db_table
+                col = opts.get_field(f.rel.field_name).column
+                # For MySQL, r_name must be unique in the first 64 characters.
+                # So we are careful with character usage here.
+                r_name = '%s_refs_%s_%s' % (r_col, col, self._digest(r_table, table))
+                if r_table not in clauses:
+                    tables.append(r_table)
+                    clauses[r_table] = []
+                clauses[r_table].append(style.SQL_KEYWORD('ADD CONSTRAINT') + ' %s FOREIGN KEY (%s) REFERENCES %s (%s)%s' %
+                    (qn(truncate_name(r_name, self.connection.ops.max_name_length())),
+                     qn(r_col), qn(table), qn(col), self.connection.ops.deferrable_sql()))
+            del pending_references[model]
+        if self._deferred is not None:
+            for table in tables:
+                self._deferred.setdefault(table, []).extend(clauses[table])
+            return []
+        return [self._sql_alter_table(table, clauses[table], style) for table in tables]
+
+    def sql_index_clauses_for_field(self, model, f, style):
+        "Returns the ALTER TABLE clauses adding the indexes of a single field."
+        if f.db_index and not f.unique:
+            qn = self.connection.ops.quote_name
+            # Named as CREATE INDEX names it, so existing indexes keep
+            # their names.
+            i_name = '%s_%s' % (model._meta.db_table, self._digest(f.column))
+            return [style.SQL_KEYWORD('ADD INDEX') + ' ' +
+                    style.SQL_TABLE(qn(truncate_name(i_name, self.connection.ops.max_name_length()))) +
+                    ' (%s)' % style.SQL_FIELD(qn(f.column))]
+        return []
+
+    def sql_indexes_for_field(self, model, f, style):
+        clauses = self.sql_index_clauses_for_field(model, f, style)
+        if not clauses:
+            return []
+        return [self._sql_alter_table(model._meta.db_table, clauses, style)]
+
+    def sql_indexes_for_model(self, model, style):
+        """
+        Returns a single ALTER TABLE adding every secondary index of the
+        model, which MySQL builds in one pass over the table instead of one
+        per CREATE INDEX, along with its foreign keys inside
+        deferred_constraints().
+        """
+        if not model._meta.managed or model._meta.proxy:
+            return []
+        clauses = []
+        for f in model._meta.local_fields:
+            clauses.extend(self.sql_index_clauses_for_field(model, f, style))
+        if self._deferred is not None:
+            clauses.extend(self._deferred.pop(model._meta.db_table, []))
+        if not clauses:
+            return []
+        return [self._sql_alter_table(model._meta.db_table, clauses, style)]
+
     def sql_for_inline_many_to_many_references(self, model, field, style):
         from django.db import models
         opts = model._meta
@@ -102,4 +206,179 @@ class DatabaseCreation(BaseDatabaseCreation):
                 print "Tests cancelled."
                 sys.exit(1)
 
-        return test_database_name
\ No newline at end of file
+        return test_database_name
+
+    def _models_hash(self):
+        """
+        Returns a hash of the SQL which creates every installed model, so that
+        a test database template is rebuilt whenever the schema changes.
+        """
+        from django.core.management.color import no_style
+        from django.db import models
+        style = no_style()
+        digest = hashlib.md5()
+        known_models = set()
+        for model in models.get_models(include_auto_created=True):
+            output, references = self.sql_create_model(model, style, known_models)
+            digest.update('\n'.join(output + self.sql_indexes_for_model(model, style)))
+            known_models.add(model)
+        # The template holds the cache tables too.
+        digest.update('\n'.join(self._cache_table_names()))
+        return digest.hexdigest()
+
+    def _cache_table_names(self):
+        """
+        Returns the tables of the database cache backends in ``CACHES``
+        which the router lets this database hold.
+        """
+        from django.core.cache import get_cache
+        from django.core.cache.backends.db import BaseDatabaseCache
+        from django.db import router
+        tables = []
+        for cache_alias in settings.CACHES:
+            cache = get_cache(cache_alias)
+            if isinstance(cache, BaseDatabaseCache) and \
+                    router.allow_syncdb(self.connection.alias, cache.cache_model_class):
+                tables.append(cache._table)
+        return sorted(tables)
+
+    def _test_template_name(self):
+        return '%s%s_%s' % (TEST_TEMPLATE_PREFIX, self.connection.settings_dict['NAME'],
+                            self._models_hash()[:12])
+
+    def _build_test_template(self, template_name, verbosity):
+        """
+        Creates the template database and sets it up as the base
+        create_test_db() would set up the test database: syncdb, then a
+        flush to load the initial data, then the cache tables.
+        """
+        from django.core.management import call_command
+        suffix = self.sql_table_creation_suffix()
+        qn = self.connection.ops.quote_name
+
+        cursor = self.connection.cursor()
+        self.set_autocommit()
+        # Templates of earlier versions of the schema are no use any more.
+        cursor.execute("SELECT schema_name FROM information_schema.schemata WHERE schema_name LIKE %s",
+                       [TEST_TEMPLATE_PREFIX.replace('_', '\\_') + '%'])
+        prefix = template_name.rsplit('_', 1)[0] + '_'
+        for (name,) in cursor.fetchall():
+            if name.startswith(prefix) and '_' not in name[len(prefix):]:
+                cursor.execute("DROP DATABASE %s" % qn(name), plain_query=True)
+        cursor.execute("CREATE DATABASE %s %s" % (qn(template_name), suffix), plain_query=True)
+
+        database_name = self.connection.settings_dict['NAME']
+        self.connection.close()
+        self.connection.settings_dict['NAME'] = template_name
+        try:
+            with self.deferred_constraints():
+                call_command('syncdb', verbosity=max(verbosity - 1, 0), interactive=False,
+                             database=self.connection.alias, load_initial_data=False)
+            call_command('flush', verbosity=max(verbosity - 1, 0), interactive=False,
+                         database=self.connection.alias)
+            for cache_table in self._cache_table_names():
+                call_command('createcachetable', cache_table, database=self.connection.alias)
+        except:
+            # Don't leave a half-built template behind to be cloned later.
+            self.connection.cursor().execute("DROP DATABASE %s" % qn(template_name), plain_query=True)
+            raise
+        finally:
+            self.connection.close()
+            self.connection.settings_dict['NAME'] = database_name
+
+    def _clone_test_template(self, template_name, database_name):
+        """
+        Copies every table of the template, including the rows loaded into it
+        by syncdb, into an existing empty database.
+        """
+        qn = self.connection.ops.quote_name
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = %s AND table_type = 'BASE TABLE'""", [template_name])
+        tables = [row[0] for row in cursor.fetchall()]
+        # SHOW CREATE TABLE is used rather than CREATE TABLE ... LIKE, which
+        # would drop the foreign keys. Its unqualified REFERENCES clauses need
+        # the new database to be the current one.
+        cursor.execute("USE %s" % qn(database_name), plain_query=True)
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0", plain_query=True)
+        try:
+            for table in tables:
+                cursor.execute("SHOW CREATE TABLE %s.%s" % (qn(template_name), qn(table)), plain_query=True)
+                cursor.execute(cursor.fetchone()[1], plain_query=True)
+                cursor.execute("INSERT INTO %s SELECT * FROM %s.%s" % (qn(table), qn(template_name), qn(table)),
+                               plain_query=True)
+        finally:
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1", plain_query=True)
+            # Switch back, so that a pooled connection is returned to the
+            # pool for its own database still using it.
+            cursor.execute("USE %s" % qn(self.connection.settings_dict['NAME']), plain_query=True)
+        self.connection._commit()
+
+    def create_test_db(self, verbosity=1, autoclobber=False):
+        """
+        With ``TEST_TEMPLATE`` set in the database settings, the schema built
+        by syncdb is kept in a template database keyed by a hash of the
+        models, and later test runs copy it rather than running syncdb again.
+        The template must be dropped by hand if initial data changes without
+        the models changing.
+        """
+        if not self.connection.settings_dict.get('TEST_TEMPLATE'):
+            with self.deferred_constraints():
+                return super(DatabaseCreation, self).create_test_db(verbosity, autoclobber)
+
+        template_name = self._test_template_name()
+        if verbosity >= 1:
+            print "Creating test database for alias '%s' from template..." % self.connection.alias
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT 1 FROM information_schema.schemata WHERE schema_name = %s", [template_name])
+        if cursor.fetchone() is None:
+            if verbosity >= 1:
+                print "Creating test database template %s..." % template_name
+            self._build_test_template(template_name, verbosity)
+
+        test_database_name = self._create_test_db(verbosity, autoclobber)
+        self._clone_test_template(template_name, test_database_name)
+        self._test_template = template_name
+        self._test_clones = []
+
+        self.connection.close()
+        self.connection.settings_dict["NAME"] = test_database_name
+        self.connection.features.confirm()
+
+        # Get a cursor (even though we don't need one yet). This has
+        # the side effect of initializing the test database.
+        cursor = self.connection.cursor()
+        return test_database_name
+
+    def clone_test_db(self, suffix, verbosity=1):
+        """
+        Creates another copy of the test database named after it plus
+        ``suffix``, e.g. one per parallel test worker, and returns its name.
+        Only available after create_test_db() has used a template.
+        """
+        qn = self.connection.ops.quote_name
+        database_name = '%s_%s' % (self.connection.settings_dict['NAME'], suffix)
+        if verbosity >= 1:
+            print "Cloning test database %s..." % database_name
+        cursor = self.connection.cursor()
+        self.set_autocommit()
+        cursor.execute("DROP DATABASE IF EXISTS %s" % qn(database_name), plain_query=True)
+        cursor.execute("CREATE DATABASE %s %s" % (qn(database_name), self.sql_table_creation_suffix()),
+                       plain_query=True)
+        self._test_clones.append(database_name)
+        self._clone_test_template(self._test_template, database_name)
+        return database_name
+
+    def destroy_test_db(self, old_database_name, verbosity=1):
+        "Drops the copies made by clone_test_db() along with the test database."
+        clones = getattr(self, '_test_clones', None)
+        if clones:
+            qn = self.connection.ops.quote_name
+            cursor = self.connection.cursor()
+            for database_name in clones:
+                if verbosity >= 1:
+                    print "Destroying test database clone %s..." % database_name
+                cursor.execute("DROP DATABASE IF EXISTS %s" % qn(database_name), plain_query=True)
+            self._test_clones = []
+        super(DatabaseCreation, self).destroy_test_db(old_database_name, verbosity)
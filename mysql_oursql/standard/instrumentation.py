@@ -0,0 +1,160 @@
+"""
+Hooks for observing the queries run through CursorWrapper.
+
+Listeners are callables which receive a QueryEvent after every execute,
+executemany and fetch call, on any oursql connection::
+
+    from mysql_oursql.standard import instrumentation
+
+    histogram = instrumentation.Histogram()
+    instrumentation.register(histogram)
+
+When nothing is registered the wrapper only pays for checking that
+``listeners`` is empty.
+"""
+
+import logging
+import re
+
+from mysql_oursql.standard.utils import LRUCache
+
+listeners = []
+
+logger = logging.getLogger('mysql_oursql.instrumentation')
+
+def register(listener):
+    if listener not in listeners:
+        listeners.append(listener)
+
+def unregister(listener):
+    if listener in listeners:
+        listeners.remove(listener)
+
+fingerprint_re = re.compile(r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|(`[^`]*`)|\b\d+(?:\.\d+)?\b""", re.S)
+in_list_re = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+whitespace_re = re.compile(r'\s+')
+
+fingerprint_cache = LRUCache(maxsize=2048)
+
+def _strip_literal(match):
+    # Quoted identifiers are part of the query's shape; anything else matched
+    # is a literal value.
+    return match.group(1) or '?'
+
+def fingerprint(query):
+    """
+    Returns ``query`` normalised so that queries differing only in their
+    literal values, or the length of an IN (...) list, look the same.
+    """
+    result = fingerprint_cache.get(query)
+    if result is None:
+        result = fingerprint_re.sub(_strip_literal, query)
+        result = in_list_re.sub('(?+)', result)
+        result = whitespace_re.sub(' ', result).strip()
+        fingerprint_cache.set(query, result)
+    return result
+
+class QueryEvent(object):
+    """
+    What happened in one call to a cursor.
+
+    ``kind`` is ``'execute'``, ``'executemany'`` or ``'fetch'``. ``rows`` is
+    the rowcount reported after an execute or the number of rows returned
+    by a fetch, and ``bytes`` a rough size of the data fetched. ``retry`` is
+    set when the call was only made to retry a failed one, and ``reconnect``
+    when a new connection was opened to do so.
+    """
+    def __init__(self, kind, alias, query, duration, rows=None, bytes=0,
+                 retry=False, reconnect=False, error=None):
+        self.kind = kind
+        self.alias = alias
+        self.query = query
+        self.duration = duration
+        self.rows = rows
+        self.bytes = bytes
+        self.retry = retry
+        self.reconnect = reconnect
+        self.error = error
+
+    @property
+    def fingerprint(self):
+        return fingerprint(self.query)
+
+def notify(event):
+    for listener in listeners:
+        try:
+            listener(event)
+        except Exception:
+            logger.exception('Error in query listener %r', listener)
+
+def row_bytes(rows):
+    "A rough count of the bytes taken up by the values in ``rows``."
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, basestring):
+                total += len(value)
+            elif value is not None:
+                total += 8
+    return total
+
+class LoggingListener(object):
+    "Logs every execute to ``logger`` at DEBUG level."
+    def __init__(self, logger=logger):
+        self.logger = logger
+
+    def __call__(self, event):
+        if event.kind != 'fetch':
+            self.logger.debug('(%.3f) %s; rows=%s%s', event.duration,
+                              event.fingerprint, event.rows,
+                              event.retry and ' (retried)' or '')
+
+class StatsdListener(object):
+    """
+    Reports timings and counts to a statsd-style client with ``timing`` and
+    ``incr`` methods.
+    """
+    def __init__(self, client, prefix='mysql'):
+        self.client = client
+        self.prefix = prefix
+
+    def __call__(self, event):
+        name = '%s.%s.%s' % (self.prefix, event.alias, event.kind)
+        self.client.timing(name, event.duration * 1000)
+        if event.retry:
+            self.client.incr('%s.retry' % name)
+        if event.error is not None:
+            self.client.incr('%s.error' % name)
+
+class Histogram(object):
+    """
+    Collects per-fingerprint call counts, timings and row counts in memory.
+    """
+    def __init__(self):
+        self.queries = {}
+
+    def __call__(self, event):
+        stats = self.queries.get(event.fingerprint)
+        if stats is None:
+            stats = self.queries[event.fingerprint] = {
+                'calls': 0, 'time': 0.0, 'max_time': 0.0, 'rows': 0,
+                'affected': 0, 'bytes': 0, 'retries': 0,
+            }
+        if event.kind == 'fetch':
+            stats['rows'] += event.rows
+            stats['bytes'] += event.bytes
+        else:
+            stats['calls'] += 1
+            stats['affected'] += max(event.rows or 0, 0)
+        stats['time'] += event.duration
+        stats['max_time'] = max(stats['max_time'], event.duration)
+        stats['retries'] += event.retry and 1 or 0
+
+    def slowest(self, n=10):
+        "Returns the ``n`` fingerprints with the most total time."
+        items = self.queries.items()
+        items.sort(key=lambda item: item[1]['time'], reverse=True)
+        return items[:n]
+
+    def reset(self):
+        self.queries.clear()
@@ -1,6 +1,7 @@
 from django.db.backends import BaseDatabaseIntrospection
 from mysql_oursql.constants import FIELD_TYPE
 from oursql import ProgrammingError, OperationalError
+from contextlib import contextmanager
 import re
 
 foreign_key_re = re.compile(r"\sCONSTRAINT `[^`]*` FOREIGN KEY \(`([^`]*)`\) REFERENCES `([^`]*)` \(`([^`]*)`\)")
@@ -28,13 +29,136 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
         FIELD_TYPE.VAR_STRING: 'CharField',
     }
 
+    # Maps information_schema.columns.data_type to the type codes oursql
+    # reports in cursor.description. Anything else is described as a plain
+    # string column.
+    data_type_codes = {
+        'bigint': FIELD_TYPE.LONGLONG,
+        'binary': FIELD_TYPE.STRING,
+        'bit': FIELD_TYPE.BIT,
+        'blob': FIELD_TYPE.BLOB,
+        'char': FIELD_TYPE.STRING,
+        'date': FIELD_TYPE.DATE,
+        'datetime': FIELD_TYPE.DATETIME,
+        'decimal': FIELD_TYPE.NEWDECIMAL,
+        'double': FIELD_TYPE.DOUBLE,
+        'enum': FIELD_TYPE.STRING,
+        'float': FIELD_TYPE.FLOAT,
+        'geometry': FIELD_TYPE.GEOMETRY,
+        'geometrycollection': FIELD_TYPE.GEOMETRY,
+        'int': FIELD_TYPE.LONG,
+        'linestring': FIELD_TYPE.GEOMETRY,
+        'longblob': FIELD_TYPE.BLOB,
+        'longtext': FIELD_TYPE.BLOB,
+        'mediumblob': FIELD_TYPE.BLOB,
+        'mediumint': FIELD_TYPE.INT24,
+        'mediumtext': FIELD_TYPE.BLOB,
+        'multilinestring': FIELD_TYPE.GEOMETRY,
+        'multipoint': FIELD_TYPE.GEOMETRY,
+        'multipolygon': FIELD_TYPE.GEOMETRY,
+        'point': FIELD_TYPE.GEOMETRY,
+        'polygon': FIELD_TYPE.GEOMETRY,
+        'set': FIELD_TYPE.STRING,
+        'smallint': FIELD_TYPE.SHORT,
+        'text': FIELD_TYPE.BLOB,
+        'time': FIELD_TYPE.TIME,
+        'timestamp': FIELD_TYPE.TIMESTAMP,
+        'tinyblob': FIELD_TYPE.BLOB,
+        'tinyint': FIELD_TYPE.TINY,
+        'tinytext': FIELD_TYPE.BLOB,
+        'varbinary': FIELD_TYPE.VAR_STRING,
+        'varchar': FIELD_TYPE.VAR_STRING,
+        'year': FIELD_TYPE.YEAR,
+    }
+
+    def load_schema(self, cursor):
+        """
+        Loads the columns, foreign keys and indexes of every table in the
+        database with three information_schema queries and caches them for
+        the current connection, so that the per-table methods don't need to
+        query the server. Does nothing if information_schema is missing.
+        """
+        columns, relations, indexes = {}, {}, {}
+        try:
+            cursor.execute("""
+                SELECT table_name, column_name, data_type,
+                    COALESCE(character_maximum_length, numeric_precision),
+                    numeric_precision, numeric_scale, is_nullable
+                FROM information_schema.columns
+                WHERE table_schema = DATABASE()
+                ORDER BY table_name, ordinal_position""")
+            for row in cursor.fetchall():
+                table_name, column_name, data_type = row[:3]
+                columns.setdefault(table_name, []).append((column_name,
+                    self.data_type_codes.get(data_type.lower(), FIELD_TYPE.STRING),
+                    None, row[3], row[4], row[5], row[6] == 'YES'))
+
+            cursor.execute("""
+                SELECT table_name, column_name, referenced_table_name, referenced_column_name
+                FROM information_schema.key_column_usage
+                WHERE table_schema = DATABASE()
+                    AND referenced_table_name IS NOT NULL
+                    AND referenced_column_name IS NOT NULL""")
+            for table_name, column_name, other_table, other_column in cursor.fetchall():
+                relations.setdefault(table_name, []).append((column_name, other_table, other_column))
+
+            # Primary keys and unique indexes are read last so that they win
+            # when a column is covered by several indexes.
+            cursor.execute("""
+                SELECT table_name, column_name, index_name, non_unique
+                FROM information_schema.statistics
+                WHERE table_schema = DATABASE()
+                ORDER BY table_name, index_name = 'PRIMARY', non_unique DESC, seq_in_index""")
+            for table_name, column_name, index_name, non_unique in cursor.fetchall():
+                indexes.setdefault(table_name, {})[column_name] = {
+                    'primary_key': index_name == 'PRIMARY',
+                    'unique': not non_unique,
+                }
+        except (ProgrammingError, OperationalError):
+            return
+        self.connection.connection_state['schema'] = {
+            'columns': columns,
+            'relations': relations,
+            'indexes': indexes,
+        }
+
+    def clear_schema(self):
+        "Forgets anything cached by load_schema()."
+        self.connection.connection_state.pop('schema', None)
+
+    @contextmanager
+    def bulk(self, cursor):
+        """
+        Answers introspection inside the block from a single load_schema(),
+        e.g. for tools walking every table in a large database.
+        """
+        self.load_schema(cursor)
+        try:
+            yield self
+        finally:
+            self.clear_schema()
+
+    def _cached(self, kind, table_name):
+        schema = self.connection.connection_state.get('schema')
+        if schema is None or table_name not in schema['columns']:
+            return None
+        if kind == 'indexes':
+            return schema[kind].get(table_name, {})
+        return schema[kind].get(table_name, [])
+
     def get_table_list(self, cursor):
         "Returns a list of table names in the current database."
+        if self.connection.settings_dict['OPTIONS'].get('bulk_introspection') and \
+                'schema' not in self.connection.connection_state:
+            self.load_schema(cursor)
         cursor.execute("SHOW TABLES", plain_query=True)
         return [row[0] for row in cursor.fetchall()]
 
     def get_table_description(self, cursor, table_name):
         "Returns a description of the table, with the DB-API cursor.description interface."
+        description = self._cached('columns', table_name)
+        if description is not None:
+            return description
         cursor.execute("SELECT * FROM %s LIMIT 1" % self.connection.ops.quote_name(table_name))
         return cursor.description
 
@@ -51,8 +175,23 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
         representing all relationships to the given table. Indexes are 0-based.
         """
         my_field_dict = self._name_to_index(cursor, table_name)
-        constraints = []
         relations = {}
+        for my_fieldname, other_table, other_field in self._get_constraints(cursor, table_name):
+            other_field_index = self._name_to_index(cursor, other_table)[other_field]
+            my_field_index = my_field_dict[my_fieldname]
+            relations[my_field_index] = (other_field_index, other_table)
+
+        return relations
+
+    def _get_constraints(self, cursor, table_name):
+        """
+        Returns a list of (column, referenced_table, referenced_column) for
+        the foreign keys on the given table.
+        """
+        constraints = self._cached('relations', table_name)
+        if constraints is not None:
+            return constraints
+        constraints = []
         try:
             # This should work for MySQL 5.0.
             cursor.execute("""
@@ -75,13 +214,7 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
                         break
                     pos = match.end()
                     constraints.append(match.groups())
-
-        for my_fieldname, other_table, other_field in constraints:
-            other_field_index = self._name_to_index(cursor, other_table)[other_field]
-            my_field_index = my_field_dict[my_fieldname]
-            relations[my_field_index] = (other_field_index, other_table)
-
-        return relations
+        return constraints
 
     def get_indexes(self, cursor, table_name):
         """
@@ -90,6 +223,9 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
             {'primary_key': boolean representing whether it's the primary key,
              'unique': boolean representing whether it's a unique index}
         """
+        indexes = self._cached('indexes', table_name)
+        if indexes is not None:
+            return indexes
         cursor.execute("SHOW INDEX FROM %s" % self.connection.ops.quote_name(table_name), plain_query=True)
         indexes = {}
         for row in cursor.fetchall():
@@ -0,0 +1,96 @@
+"""
+Loading rows in bulk with LOAD DATA LOCAL INFILE.
+
+bulk_load() writes rows to a temporary file in the escaped, tab-separated
+format LOAD DATA reads by default and has the server load it, which is
+several times faster than even batched INSERTs. Rows are written and loaded
+``chunk_size`` at a time, so neither memory nor the temporary file grows
+with the number of rows.
+
+The connection must be opened with ``OPTIONS['local_infile'] = True``, and
+the server must allow ``local_infile`` too.
+"""
+
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+
+# Characters LOAD DATA treats specially, and how to escape them.
+ESCAPES = [('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r'), ('\0', '\\0')]
+
+def _escape(value):
+    for char, escaped in ESCAPES:
+        if char in value:
+            value = value.replace(char, escaped)
+    return value
+
+def to_field(value, ops, encoding):
+    "Returns ``value`` as a field of a LOAD DATA file."
+    if value is None:
+        return '\\N'
+    if isinstance(value, unicode):
+        return _escape(value.encode(encoding))
+    if isinstance(value, str):
+        return _escape(value)
+    if isinstance(value, bool):
+        return value and '1' or '0'
+    if isinstance(value, (int, long, Decimal)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, datetime.datetime):
+        return ops.value_to_db_datetime(value).encode(encoding)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, datetime.time):
+        return ops.value_to_db_time(value).encode(encoding)
+    return _escape(unicode(value).encode(encoding))
+
+def _write_chunk(f, rows, size, ops, encoding):
+    "Writes up to ``size`` rows to ``f`` and returns how many there were."
+    count = 0
+    for row in rows:
+        f.write('\t'.join([to_field(value, ops, encoding) for value in row]))
+        f.write('\n')
+        count += 1
+        if count >= size:
+            break
+    return count
+
+def bulk_load(connection, table, columns, rows, chunk_size=100000):
+    """
+    Loads ``rows``, an iterable of sequences of values for ``columns``, into
+    ``table`` through ``connection`` (a DatabaseWrapper), and returns the
+    number of rows loaded.
+    """
+    ops = connection.ops
+    charset = connection.get_connection_params().get('charset') or 'utf8'
+    encoding = charset.startswith('utf8') and 'utf-8' or charset
+    rows = iter(rows)
+    fd, path = tempfile.mkstemp(suffix='.tsv')
+    sql = "LOAD DATA LOCAL INFILE '%s' INTO TABLE %s CHARACTER SET %s (%s)" % (
+        path.replace('\\', '\\\\').replace("'", "\\'"), ops.quote_name(table), charset,
+        ', '.join([ops.quote_name(column) for column in columns]))
+    # Make sure there's a connection, but wrap its cursor directly so that
+    # plain_query gets through even when Django's debug cursor is in use.
+    connection.cursor()
+    cursor = connection.cursor_wrapper(connection.connection.cursor(), connection)
+    loaded = 0
+    try:
+        f = os.fdopen(fd, 'wb')
+        try:
+            while True:
+                f.seek(0)
+                f.truncate()
+                if not _write_chunk(f, rows, chunk_size, ops, encoding):
+                    break
+                f.flush()
+                cursor.execute(sql, plain_query=True)
+                loaded += cursor.rowcount
+        finally:
+            f.close()
+    finally:
+        cursor.close()
+        os.remove(path)
+    return loaded
@@ -1,6 +1,10 @@
 from django.db.backends import BaseDatabaseOperations
 
 class DatabaseOperations(BaseDatabaseOperations):
+    def __init__(self, connection=None):
+        super(DatabaseOperations, self).__init__()
+        self.connection = connection
+
     def date_extract_sql(self, lookup_type, field_name):
         # http://dev.mysql.com/doc/mysql/en/date-and-time-functions.html
         if lookup_type == 'week_day':
@@ -11,16 +15,22 @@ class DatabaseOperations(BaseDatabaseOperations):
             return "EXTRACT(%s FROM %s)" % (lookup_type.upper(), field_name)
 
     def date_trunc_sql(self, lookup_type, field_name):
-        fields = ['year', 'month', 'day', 'hour', 'minute', 'second']
-        format = ('%%Y-', '%%m', '-%%d', ' %%H:', '%%i', ':%%s') # Use double percents to escape.
-        format_def = ('0000-', '01', '-01', ' 00:', '00', ':00')
-        try:
-            i = fields.index(lookup_type) + 1
-        except ValueError:
-            sql = field_name
+        # Built from date arithmetic rather than formatting the value as a
+        # string and parsing it back, which is several times cheaper per row.
+        if lookup_type == 'year':
+            sql = "TIMESTAMP(MAKEDATE(YEAR(%s), 1))" % field_name
+        elif lookup_type == 'month':
+            sql = "TIMESTAMP(MAKEDATE(YEAR(%s), 1) + INTERVAL (MONTH(%s) - 1) MONTH)" % (field_name, field_name)
+        elif lookup_type == 'day':
+            sql = "TIMESTAMP(DATE(%s))" % field_name
+        elif lookup_type == 'hour':
+            sql = "TIMESTAMP(DATE(%s), MAKETIME(HOUR(%s), 0, 0))" % (field_name, field_name)
+        elif lookup_type == 'minute':
+            sql = "TIMESTAMP(DATE(%s), MAKETIME(HOUR(%s), MINUTE(%s), 0))" % (field_name, field_name, field_name)
+        elif lookup_type == 'second':
+            sql = "TIMESTAMP(DATE(%s), MAKETIME(HOUR(%s), MINUTE(%s), SECOND(%s)))" % (field_name, field_name, field_name, field_name)
         else:
-            format_str = ''.join([f for f in format[:i]] + [f for f in format_def[i:]])
-            sql = "CAST(DATE_FORMAT(%s, '%s') AS DATETIME)" % (field_name, format_str)
+            sql = field_name
         return sql
 
     def drop_foreignkey_sql(self):
@@ -37,6 +47,9 @@ class DatabaseOperations(BaseDatabaseOperations):
     def fulltext_search_sql(self, field_name):
         return 'MATCH (%s) AGAINST (%%s IN BOOLEAN MODE)' % field_name
 
+    def max_name_length(self):
+        return 64
+
     def no_limit_value(self):
         # 2**64 - 1, as recommended by the MySQL documentation
         return 18446744073709551615L
@@ -50,6 +63,72 @@ class DatabaseOperations(BaseDatabaseOperations):
         return 'RAND()'
 
     def sql_flush(self, style, tables, sequences):
+        tracker = self.connection is not None and self.connection.write_tracker
+        if tracker and tracker.dirty is not None:
+            return self._sql_flush_dirty(style, tables, sequences, tracker)
+        sql = self._sql_flush_all(style, tables, sequences)
+        if tracker:
+            tracker.reset(sql)
+        return sql
+
+    def _untracked_writes(self, tables, tracker):
+        """
+        Returns the tables among ``tables`` which hold rows, and those whose
+        auto-increment counter has moved, although the tracker saw no writes
+        to them: they were written to by another thread's or process's
+        connection, such as a live server's, or by AsyncDatabase's workers.
+        """
+        untracked = [table for table in tables if table not in tracker.dirty]
+        if not untracked:
+            return set(), set()
+        # Make sure there's a connection, but read from it directly so that
+        # the checks neither go to a replica nor count as writes.
+        self.connection.cursor()
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.execute(' UNION ALL '.join(['(SELECT ? FROM %s LIMIT 1)' % self.quote_name(table)
+                                               for table in untracked]), untracked)
+            written = set([row[0] for row in cursor.fetchall()])
+            cursor.execute("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_schema = DATABASE() AND auto_increment > 1""", plain_query=True)
+            incremented = set([row[0] for row in cursor.fetchall()]) - tracker.inserted
+        finally:
+            cursor.close()
+        return written, incremented
+
+    def _sql_flush_dirty(self, style, tables, sequences, tracker):
+        """
+        Used with ``OPTIONS['flush'] = 'delete'`` once the tables written to
+        since the last flush are known. DELETE is much cheaper than TRUNCATE
+        on InnoDB for the small tables tests leave behind, and auto-increment
+        counters are only reset where rows were inserted. Tables written to
+        behind the tracker's back are found by looking at them.
+        """
+        written, incremented = self._untracked_writes(tables, tracker)
+        dirty = [table for table in tables if table in tracker.dirty or table in written]
+        sequences = [sequence for sequence in sequences
+                     if sequence['table'] in tracker.inserted or sequence['table'] in written
+                     or sequence['table'] in incremented]
+        if not dirty and not sequences:
+            tracker.reset()
+            return []
+        sql = ['SET FOREIGN_KEY_CHECKS = 0;']
+        for table in dirty:
+            sql.append('%s %s %s;' % (style.SQL_KEYWORD('DELETE'), style.SQL_KEYWORD('FROM'),
+                                      style.SQL_FIELD(self.quote_name(table))))
+        sql.append('SET FOREIGN_KEY_CHECKS = 1;')
+        sql.extend(["%s %s %s %s %s;" % \
+            (style.SQL_KEYWORD('ALTER'),
+             style.SQL_KEYWORD('TABLE'),
+             style.SQL_TABLE(self.quote_name(sequence['table'])),
+             style.SQL_KEYWORD('AUTO_INCREMENT'),
+             style.SQL_FIELD('= 1'),
+            ) for sequence in sequences])
+        tracker.reset(sql)
+        return sql
+
+    def _sql_flush_all(self, style, tables, sequences):
         # NB: The generated SQL below is specific to MySQL
         # 'TRUNCATE x;', 'TRUNCATE y;', 'TRUNCATE z;'... style SQL statements
         # to clear all tables of all data
@@ -95,7 +174,14 @@ class DatabaseOperations(BaseDatabaseOperations):
         return unicode(value.replace(microsecond=0))
 
     def year_lookup_bounds(self, value):
-        # Again, no microseconds
+        # Again, no microseconds. The bounds are valid DATETIME literals so
+        # that the BETWEEN can be resolved as a range scan on an index.
         first = '%s-01-01 00:00:00'
-        second = '%s-12-31 23:59:59.99'
+        second = '%s-12-31 23:59:59'
+        return [first % value, second % value]
+
+    def year_lookup_bounds_for_date_field(self, value):
+        # Plain dates, so DATE columns aren't compared against a DATETIME.
+        first = '%s-01-01'
+        second = '%s-12-31'
         return [first % value, second % value]
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""
+A process-wide pool of oursql connections.
+
+Enabled per database with ``OPTIONS['pool']``, a dictionary which may contain:
+
+    max_size        connections kept open by the pool (default 10)
+    overflow        extra connections opened when the pool is exhausted and
+                    closed again, rather than kept, when returned (default 0)
+    min_idle        idle connections the pool tries to keep ready (default 0)
+    max_lifetime    seconds after which a connection is closed rather than
+                    reused (default None, meaning forever)
+    timeout         seconds to wait for a connection once ``max_size`` plus
+                    ``overflow`` are checked out (default 30)
+    ping_after      seconds a connection may sit idle before it is pinged on
+                    checkout, and replaced if the server has dropped it
+                    (default 30; None never pings)
+    reset_variables session variables set back to their global defaults when
+                    a connection is returned (default sql_mode and time_zone),
+                    or to the values given in OPTIONS if they're set there
+"""
+
+import threading
+import time
+
+from oursql import DatabaseError, Error
+
+class PoolTimeout(DatabaseError):
+    pass
+
+class ConnectionPool(object):
+    def __init__(self, connect, max_size=10, overflow=0, min_idle=0,
+                 max_lifetime=None, timeout=30, ping_after=30,
+                 reset_variables=('sql_mode', 'time_zone')):
+        self.connect = connect
+        self.max_size = max_size
+        self.overflow = overflow
+        self.min_idle = min(min_idle, max_size)
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.reset_variables = tuple(reset_variables)
+
+        # Idle connections as (connection, created, returned) triples, most
+        # recently returned last so that checkout reuses the warmest one.
+        self._idle = []
+        # Creation time of every open connection, keyed by id().
+        self._created = {}
+        # State kept alongside each open connection, keyed by id().
+        self._state = {}
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._top_up()
+
+    def _expired(self, created):
+        return self.max_lifetime is not None and time.time() - created > self.max_lifetime
+
+    def _reserve(self):
+        """
+        Claims a slot for a new connection while holding the lock, so that
+        the connection itself can be opened without it.
+        """
+        token = object()
+        self._created[id(token)] = time.time()
+        return token
+
+    def _open(self, token):
+        "Opens a connection in the slot claimed by ``_reserve()``."
+        try:
+            connection = self.connect()
+        except:
+            self._lock.acquire()
+            try:
+                del self._created[id(token)]
+                self._available.notify()
+            finally:
+                self._lock.release()
+            raise
+        self._lock.acquire()
+        try:
+            del self._created[id(token)]
+            created = self._created[id(connection)] = time.time()
+        finally:
+            self._lock.release()
+        return connection, created
+
+    def state(self, connection):
+        """
+        Returns a dictionary which lives as long as ``connection`` does, for
+        caching things tied to it across checkouts.
+        """
+        self._lock.acquire()
+        try:
+            return self._state.setdefault(id(connection), {})
+        finally:
+            self._lock.release()
+
+    def _close(self, connection):
+        self._lock.acquire()
+        try:
+            self._state.pop(id(connection), None)
+        finally:
+            self._lock.release()
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _top_up(self):
+        "Opens connections until ``min_idle`` of them are waiting to be used."
+        while True:
+            self._lock.acquire()
+            try:
+                if len(self._idle) >= self.min_idle or len(self._created) >= self.max_size:
+                    return
+                token = self._reserve()
+            finally:
+                self._lock.release()
+            connection, created = self._open(token)
+            self._lock.acquire()
+            try:
+                self._idle.append((connection, created, time.time()))
+                self._available.notify()
+            finally:
+                self._lock.release()
+
+    def _replenish(self):
+        # Refilling the pool is opportunistic; a failure here shouldn't
+        # affect the connection being returned or discarded.
+        try:
+            self._top_up()
+        except Error:
+            pass
+
+    def _take(self, deadline):
+        """
+        Returns an idle connection and when it was returned, or a token for
+        opening a new one, as a (connection, returned, token) triple. Waits
+        until ``deadline`` for either.
+        """
+        stale = []
+        self._lock.acquire()
+        try:
+            while True:
+                while self._idle:
+                    connection, created, returned = self._idle.pop()
+                    if self._expired(created):
+                        del self._created[id(connection)]
+                        stale.append(connection)
+                        continue
+                    return connection, returned, None
+                if len(self._created) < self.max_size + self.overflow:
+                    return None, None, self._reserve()
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise PoolTimeout('Timed out waiting for a connection from the pool.')
+                self._available.wait(remaining)
+        finally:
+            self._lock.release()
+            for connection in stale:
+                self._close(connection)
+
+    def _alive(self, connection, returned):
+        """
+        Pings a connection which has been idle for longer than
+        ``ping_after``, since the server may have closed it after its
+        ``wait_timeout`` in the meantime.
+        """
+        if self.ping_after is None or time.time() - returned <= self.ping_after:
+            return True
+        try:
+            connection.ping()
+        except Error:
+            return False
+        return True
+
+    def checkout(self):
+        """
+        Returns an open connection, reusing an idle one if possible. Raises
+        ``PoolTimeout`` if none becomes available within ``timeout`` seconds.
+        """
+        deadline = time.time() + self.timeout
+        while True:
+            connection, returned, token = self._take(deadline)
+            if token is not None:
+                return self._open(token)[0]
+            if self._alive(connection, returned):
+                return connection
+            self.discard(connection)
+
+    def _reset(self, connection):
+        """
+        Sets ``reset_variables`` back to their global defaults, or, for those
+        the backend manages through its session ``OPTIONS``, to the value
+        recorded in the connection's state, which so stays accurate.
+        """
+        session = self.state(connection).get('session', {})
+        assignments, params = [], []
+        for name in self.reset_variables:
+            if name in session:
+                assignments.append('%s = ?' % name)
+                params.append(session[name])
+            else:
+                assignments.append('%s = DEFAULT' % name)
+        cursor = connection.cursor()
+        try:
+            if params:
+                cursor.execute('SET SESSION %s' % ', '.join(assignments), params)
+            else:
+                cursor.execute('SET SESSION %s' % ', '.join(assignments), plain_query=True)
+        finally:
+            cursor.close()
+
+    def checkin(self, connection):
+        """
+        Returns a connection to the pool. Its transaction is rolled back and
+        its session variables reset; connections which cannot be reset, have
+        outlived ``max_lifetime`` or were opened as overflow are closed.
+
+        Whatever ``OPTIONS['init_command']`` did may have been undone by the
+        reset, or changed since, so it is forgotten and run again on the
+        next checkout.
+        """
+        try:
+            connection.rollback()
+            if self.reset_variables:
+                self._reset(connection)
+        except Error:
+            self.discard(connection)
+            return
+        self.state(connection).get('session', {}).pop('init_command', None)
+
+        self._lock.acquire()
+        try:
+            created = self._created.get(id(connection))
+            keep = (created is not None and not self._expired(created)
+                    and len(self._idle) < self.max_size
+                    and len(self._created) <= self.max_size)
+            if keep:
+                self._idle.append((connection, created, time.time()))
+            else:
+                self._created.pop(id(connection), None)
+            self._available.notify()
+        finally:
+            self._lock.release()
+        if not keep:
+            self._close(connection)
+            self._replenish()
+
+    def discard(self, connection):
+        "Closes a connection which is broken and must not be reused."
+        self._lock.acquire()
+        try:
+            self._created.pop(id(connection), None)
+            self._available.notify()
+        finally:
+            self._lock.release()
+        self._close(connection)
+        self._replenish()
+
+    def close(self):
+        "Closes every idle connection."
+        self._lock.acquire()
+        try:
+            idle, self._idle = self._idle, []
+            for connection, created, returned in idle:
+                self._created.pop(id(connection), None)
+        finally:
+            self._lock.release()
+        for connection, created, returned in idle:
+            self._close(connection)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(params, connect, options):
+    """
+    Returns the process-wide pool for the given connection parameters,
+    creating it with ``options`` if it doesn't exist yet.
+    """
+    key = repr(sorted(params.items()))
+    _pools_lock.acquire()
+    try:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(connect, **options)
+        return pool
+    finally:
+        _pools_lock.release()
@@ -0,0 +1,133 @@
+"""
+Routing of reads to replica servers.
+
+Configured with ``OPTIONS['replicas']``, a list of dictionaries giving the
+``HOST``, ``PORT``, ``USER`` and ``PASSWORD`` of each replica (anything left
+out is taken from the primary's settings) and optionally a ``weight``.
+``OPTIONS['replica_routing']`` may contain:
+
+    strategy        'round_robin' (weighted, the default) or
+                    'least_connections'
+    max_lag         replicas whose Seconds_Behind_Master exceeds this many
+                    seconds are skipped (default 30)
+    check_interval  how many seconds a replica's health is trusted before
+                    it is checked again (default 5)
+"""
+
+import re
+import threading
+import time
+
+from oursql import Error
+
+select_query_re = re.compile(r'^\s*SELECT\b', re.I)
+locking_read_re = re.compile(r'\bFOR\s+UPDATE\b|\bLOCK\s+IN\s+SHARE\s+MODE\b', re.I)
+
+def is_replica_safe(query):
+    "Returns True if ``query`` is a plain, non-locking SELECT."
+    return bool(select_query_re.match(query)) and not locking_read_re.search(query)
+
+class ReplicaSet(object):
+    """
+    The replicas of one database, shared by every thread in the process
+    along with what is known about their health and load.
+    """
+    def __init__(self, replicas, strategy='round_robin', max_lag=30, check_interval=5):
+        if strategy not in ('round_robin', 'least_connections'):
+            raise ValueError('Unknown replica routing strategy %r' % strategy)
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.weights = [replica.get('weight', 1) for replica in replicas]
+        # Open connections to each replica, for least_connections.
+        self.connections = [0] * len(replicas)
+        # Running totals for smooth weighted round-robin.
+        self._current = [0] * len(replicas)
+        # index -> (time of the last check, whether the replica was healthy)
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def _usable(self, index, now):
+        checked = self._health.get(index)
+        return checked is None or checked[1] or now - checked[0] > self.check_interval
+
+    def choose(self, exclude=()):
+        """
+        Picks a replica which isn't known to be unhealthy and counts a
+        connection against it. Returns its index, or None if there is none.
+        """
+        now = time.time()
+        self._lock.acquire()
+        try:
+            candidates = [i for i in range(len(self.replicas))
+                          if i not in exclude and self._usable(i, now)]
+            if not candidates:
+                return None
+            if self.strategy == 'least_connections':
+                index = min(candidates, key=lambda i: float(self.connections[i]) / self.weights[i])
+            else:
+                total = 0
+                for i in candidates:
+                    self._current[i] += self.weights[i]
+                    total += self.weights[i]
+                index = max(candidates, key=lambda i: self._current[i])
+                self._current[index] -= total
+            self.connections[index] += 1
+            return index
+        finally:
+            self._lock.release()
+
+    def release(self, index):
+        self._lock.acquire()
+        try:
+            self.connections[index] -= 1
+        finally:
+            self._lock.release()
+
+    def needs_check(self, index):
+        checked = self._health.get(index)
+        return checked is None or time.time() - checked[0] > self.check_interval
+
+    def mark(self, index, healthy):
+        self._health[index] = (time.time(), healthy)
+
+    def check(self, index, connection):
+        """
+        Checks how far behind its master the replica at ``index`` is, using
+        ``connection``, and records whether it is healthy.
+        """
+        healthy = False
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SHOW SLAVE STATUS', plain_query=True)
+                row = cursor.fetchone()
+                names = [d[0] for d in cursor.description or ()]
+            finally:
+                cursor.close()
+        except Error:
+            pass
+        else:
+            if row is None:
+                # Not replicating from anything, so it can't be behind.
+                healthy = True
+            else:
+                status = dict(zip(names, row))
+                lag = status.get('Seconds_Behind_Master', status.get('Seconds_Behind_Source'))
+                healthy = lag is not None and int(lag) <= self.max_lag
+        self.mark(index, healthy)
+        return healthy
+
+_replica_sets = {}
+_replica_sets_lock = threading.Lock()
+
+def get_replica_set(alias, replicas, options):
+    _replica_sets_lock.acquire()
+    try:
+        replica_set = _replica_sets.get(alias)
+        if replica_set is None:
+            replica_set = _replica_sets[alias] = ReplicaSet(replicas, **options)
+        return replica_set
+    finally:
+        _replica_sets_lock.release()
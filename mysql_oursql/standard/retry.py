@@ -0,0 +1,56 @@
+"""
+Retrying statements and transactions which failed on a transient lock error.
+
+Configured with ``OPTIONS['retry']``, either True or a dictionary which may
+contain:
+
+    attempts        retries after the first failure (default 3)
+    backoff         seconds to wait before the first retry, doubled for each
+                    one after it (default 0.05)
+    max_backoff     the most to wait before any retry (default 1.0)
+
+Waits are drawn at random between zero and the backoff ("full jitter") so
+that clients which deadlocked together don't retry in lockstep.
+"""
+
+import random
+import threading
+import time
+
+# Lock wait timeout exceeded; deadlock found when trying to get lock.
+RETRY_CODES = (1205, 1213)
+
+# How often retries have happened in this process, by error code, and how
+# often they didn't help.
+counters = {'retries': {}, 'exhausted': {}}
+_counters_lock = threading.Lock()
+
+def _count(kind, code):
+    _counters_lock.acquire()
+    try:
+        counters[kind][code] = counters[kind].get(code, 0) + 1
+    finally:
+        _counters_lock.release()
+
+class RetryPolicy(object):
+    codes = RETRY_CODES
+
+    def __init__(self, attempts=3, backoff=0.05, max_backoff=1.0):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(self, error, attempt):
+        """
+        Returns True if ``error`` is worth retrying after ``attempt`` earlier
+        retries, waiting a while first if so.
+        """
+        code = error.args and error.args[0]
+        if code not in self.codes:
+            return False
+        if attempt >= self.attempts:
+            _count('exhausted', code)
+            return False
+        _count('retries', code)
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        return True
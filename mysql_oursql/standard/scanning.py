@@ -0,0 +1,122 @@
+"""
+Scanning large tables a chunk at a time.
+
+scan() pages through a table in primary key order, reading each chunk with
+
+    SELECT ... FROM table WHERE pk > <last pk read> ORDER BY pk LIMIT n
+
+which, unlike paging with OFFSET, costs as little for the last chunk as for
+the first. Chunks are yielded as lists of rows::
+
+    for rows in connection.scan('app_event', ['id', 'payload'], chunk_size=5000):
+        ...
+
+With ``prefetch=True`` the chunks are read on a background thread, which has
+a connection of its own, while the caller works on the one before; no more
+than three chunks are held in memory at a time. That connection's
+transaction is ended after every chunk so that a long scan doesn't hold an
+old snapshot open on the server.
+"""
+
+import Queue
+import sys
+import threading
+
+def _scan_sql(ops, table, columns, pk, where, chunk_size):
+    "Returns the queries reading the first and every following chunk."
+    qn = ops.quote_name
+    select = 'SELECT %s FROM %s' % (columns and ', '.join([qn(c) for c in columns]) or '*', qn(table))
+    order = ' ORDER BY %s LIMIT %d' % (qn(pk), chunk_size)
+    if where:
+        first = '%s WHERE (%s)%s' % (select, where, order)
+        following = '%s WHERE %s > %%s AND (%s)%s' % (select, qn(pk), where, order)
+    else:
+        first = select + order
+        following = '%s WHERE %s > %%s%s' % (select, qn(pk), order)
+    return first, following
+
+def _read_chunks(cursor, first, following, pk, params, chunk_size, after_chunk=None):
+    cursor.execute(first, params)
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    position = [column[0] for column in cursor.description].index(pk)
+    while True:
+        if after_chunk is not None:
+            after_chunk()
+        yield rows
+        # A short chunk must be the last one.
+        if len(rows) < chunk_size:
+            return
+        cursor.execute(following, [rows[-1][position]] + list(params))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+
+def _prefetched(connection, first, following, pk, params, chunk_size):
+    chunks = Queue.Queue(maxsize=1)
+    stopped = threading.Event()
+
+    def put(item):
+        # Gives up once the caller has stopped reading.
+        while not stopped.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def run():
+        try:
+            db = connection.open_connection()
+        except Exception:
+            put(('error', sys.exc_info()))
+            return
+        try:
+            cursor = connection.cursor_wrapper(db.cursor())
+            try:
+                for rows in _read_chunks(cursor, first, following, pk, params, chunk_size, db.rollback):
+                    if not put(('rows', rows)):
+                        return
+                put(('done', None))
+            finally:
+                cursor.close()
+        except Exception:
+            put(('error', sys.exc_info()))
+        finally:
+            try:
+                db.close()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, name='oursql-scan')
+    thread.setDaemon(True)
+    thread.start()
+    try:
+        while True:
+            kind, value = chunks.get()
+            if kind == 'rows':
+                yield value
+            elif kind == 'error':
+                raise value[0], value[1], value[2]
+            else:
+                return
+    finally:
+        stopped.set()
+        thread.join()
+
+def scan(connection, table, columns=None, pk='id', chunk_size=1000, where=None,
+         params=(), prefetch=False):
+    """
+    Yields the rows of ``table`` in chunks of ``chunk_size``, in order of
+    ``pk``, which must be a unique, indexed column and among ``columns`` if
+    they are given. ``where`` is an optional condition, with ``%s``
+    placeholders for ``params``, to restrict the rows read.
+    """
+    if columns and pk not in columns:
+        raise ValueError('The column %r to page by must be one of the columns read.' % pk)
+    first, following = _scan_sql(connection.ops, table, columns, pk, where, chunk_size)
+    if prefetch:
+        return _prefetched(connection, first, following, pk, params, chunk_size)
+    return _read_chunks(connection.cursor(), first, following, pk, params, chunk_size)
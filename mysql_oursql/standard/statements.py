@@ -0,0 +1,104 @@
+import time
+import weakref
+
+from oursql import Error
+
+from mysql_oursql.standard.utils import LRUCache
+
+class StatementCache(object):
+    """
+    Keeps server-side prepared statements alive between queries on one
+    connection.
+
+    oursql prepares a statement the first time a cursor executes it and
+    reuses it for as long as the cursor keeps executing the same SQL, so
+    this holds one cursor per rewritten query. A cursor is lent to one
+    CursorWrapper at a time; if its result is still being read when the
+    same query is issued again, the second caller gets a fresh cursor.
+
+    Cursors which are lent out but not (or no longer) cached, such as those
+    fresh cursors and ones evicted while in use, are closed when their
+    wrapper releases them.
+    """
+    def __init__(self, connection, maxsize):
+        self.connection = connection
+        self.prepares = 0
+        self.prepare_time = 0.0
+        self._cursors = LRUCache(maxsize, on_evict=self._evict)
+        # [cursor, owner] entries for the uncached cursors still lent out.
+        self._lent = []
+
+    def _close(self, cursor):
+        try:
+            cursor.close()
+        except Error:
+            pass
+
+    def _evict(self, query, entry):
+        cursor, owner = entry
+        if owner is None or owner() is None:
+            self._close(cursor)
+        else:
+            # Still being read from, so it's closed once its wrapper is
+            # done with it.
+            self._lent.append(entry)
+
+    def acquire(self, query, wrapper):
+        """
+        Returns a ``(cursor, prepared)`` pair, where the cursor is lent to
+        ``wrapper`` for running ``query`` and ``prepared`` tells whether it
+        has run it before.
+        """
+        entry = self._cursors.get(query)
+        if entry is None:
+            cursor = self.connection.cursor()
+            self._cursors.set(query, [cursor, weakref.ref(wrapper)])
+            return cursor, False
+        cursor, owner = entry
+        if owner is not None and owner() not in (None, wrapper):
+            cursor = self.connection.cursor()
+            self._lent.append([cursor, weakref.ref(wrapper)])
+            return cursor, False
+        entry[1] = weakref.ref(wrapper)
+        return cursor, True
+
+    def release(self, query, wrapper):
+        """
+        Hands the cursor for ``query`` back if ``wrapper`` borrowed it, or
+        closes it if it isn't cached.
+        """
+        entry = self._cursors.peek(query)
+        if entry is not None and entry[1] is not None and entry[1]() is wrapper:
+            entry[1] = None
+            return
+        if self._lent:
+            lent = []
+            for entry in self._lent:
+                owner = entry[1]()
+                if owner is None or owner is wrapper:
+                    self._close(entry[0])
+                else:
+                    lent.append(entry)
+            self._lent = lent
+
+    def execute(self, cursor, prepared, query, args, kwargs):
+        "Executes ``query``, timing it if the statement has to be prepared."
+        if prepared:
+            return cursor.execute(query, args, **kwargs)
+        start = time.time()
+        try:
+            return cursor.execute(query, args, **kwargs)
+        finally:
+            self.prepares += 1
+            self.prepare_time += time.time() - start
+
+    def clear(self):
+        self._cursors.clear()
+
+    def stats(self):
+        stats = self._cursors.stats()
+        stats.update({
+            'prepares': self.prepares,
+            'prepare_time': self.prepare_time,
+        })
+        return stats
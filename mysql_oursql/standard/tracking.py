@@ -0,0 +1,71 @@
+import re
+
+from mysql_oursql.standard.utils import LRUCache
+
+insert_table_re = re.compile(r'^\s*(?:INSERT|REPLACE)\s+(?:(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY|IGNORE)\s+)*(?:INTO\s+)?`?([^`\s(,]+)`?', re.I)
+update_table_re = re.compile(r'^\s*UPDATE\s+(?:(?:LOW_PRIORITY|IGNORE)\s+)*`?([^`\s,]+)`?\s+SET\b', re.I)
+delete_table_re = re.compile(r'^\s*DELETE\s+(?:(?:LOW_PRIORITY|QUICK|IGNORE)\s+)*FROM\s+`?([^`\s,]+)`?(?:\s+WHERE\b|\s*;?\s*$)', re.I)
+load_table_re = re.compile(r"^\s*LOAD\s+DATA\s+(?:(?:LOW_PRIORITY|CONCURRENT|LOCAL)\s+)*INFILE\s+'(?:[^'\\]|\\.)*'\s+(?:(?:REPLACE|IGNORE)\s+)?INTO\s+TABLE\s+`?([^`\s(,]+)`?", re.I)
+read_only_re = re.compile(r'^\s*(?:SELECT|SHOW|DESCRIBE|DESC|EXPLAIN|SET|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|USE)\b', re.I)
+
+# Marks statements which write to tables we can't identify.
+UNKNOWN = object()
+
+def parse_write(query):
+    """
+    Returns ``(table, inserted)`` for a single-table write, None for a
+    statement which can't change any rows, or UNKNOWN otherwise.
+    """
+    for regex in (insert_table_re, load_table_re):
+        match = regex.match(query)
+        if match is not None:
+            return match.group(1), True
+    for regex in (update_table_re, delete_table_re):
+        match = regex.match(query)
+        if match is not None:
+            return match.group(1), False
+    if read_only_re.match(query):
+        return None
+    return UNKNOWN
+
+class WriteTracker(object):
+    """
+    Remembers which tables have been written to through a connection since
+    the last flush, so that flushing only needs to touch those.
+
+    ``dirty`` is None until the first flush, or after a statement whose
+    effect couldn't be worked out, meaning every table must be assumed to
+    have changed.
+    """
+    def __init__(self):
+        self.dirty = None
+        self.inserted = None
+        # Statements generated by the flush itself, which mustn't count.
+        self.ignored = set()
+        self._parsed = LRUCache(maxsize=1024)
+
+    def record(self, query):
+        if query in self.ignored:
+            return
+        parsed = self._parsed.get(query)
+        if parsed is None:
+            parsed = parse_write(query)
+            self._parsed.set(query, parsed or ())
+        if not parsed or self.dirty is None:
+            return
+        if parsed is UNKNOWN:
+            self.dirty = self.inserted = None
+            return
+        table, inserted = parsed
+        self.dirty.add(table)
+        if inserted:
+            self.inserted.add(table)
+
+    def reset(self, flush_sql=()):
+        """
+        Starts tracking afresh, ignoring the statements in ``flush_sql`` when
+        they are executed.
+        """
+        self.dirty = set()
+        self.inserted = set()
+        self.ignored = set(flush_sql)
@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache(object):
+    """
+    A small thread-safe, size-bounded mapping which discards the least
+    recently used entry once ``maxsize`` is exceeded.
+
+    Lookups are counted in ``hits`` and ``misses``. If ``on_evict`` is given
+    it is called with ``(key, value)`` for every entry pushed out of the cache.
+    """
+    def __init__(self, maxsize=1024, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        self._lock.acquire()
+        try:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+        finally:
+            self._lock.release()
+
+    def peek(self, key, default=None):
+        "Like get(), but neither counted nor treated as a use of ``key``."
+        return self._data.get(key, default)
+
+    def set(self, key, value):
+        evicted = []
+        self._lock.acquire()
+        try:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False))
+        finally:
+            self._lock.release()
+        if self.on_evict is not None:
+            for item in evicted:
+                self.on_evict(*item)
+
+    def pop(self, key, default=None):
+        self._lock.acquire()
+        try:
+            return self._data.pop(key, default)
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            evicted = self._data.items()
+            self._data.clear()
+        finally:
+            self._lock.release()
+        if self.on_evict is not None:
+            for item in evicted:
+                self.on_evict(*item)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
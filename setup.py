@@ -13,7 +13,7 @@ setup(
         'oursql',
     ],
     description = 'Django database backend for MySQL via oursql.',
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests']),
     include_package_data=True,
     classifiers=[
         'Framework :: Django',
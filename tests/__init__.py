@@ -0,0 +1,78 @@
+"""
+Unit tests which need Django but no MySQL server: oursql is replaced by the
+stand-in the benchmarks use. Run them from the top of the checkout with::
+
+    python -m unittest discover -t . -s tests
+"""
+
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import stub_oursql
+sys.modules['oursql'] = stub_oursql
+
+from django.conf import settings
+if not settings.configured:
+    settings.configure(DEBUG=False)
+
+def settings_dict(**options):
+    "Returns the settings of a database using the backend with ``options``."
+    return {
+        'ENGINE': 'mysql_oursql.standard',
+        'NAME': 'test', 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+        'OPTIONS': options,
+        'TEST_NAME': None, 'TEST_CHARSET': None, 'TEST_COLLATION': None,
+        'TEST_MIRROR': None, 'TIME_ZONE': None,
+    }
+
+class Cursor(stub_oursql.Cursor):
+    def execute(self, query, params=(), plain_query=False):
+        connection = self.connection
+        connection.queries.append((query, tuple(params)))
+        if connection.errors:
+            error = connection.errors.pop(0)
+            if error is not None:
+                raise error
+        for prefix, (description, rows) in connection.results.items():
+            if query.lstrip().startswith(prefix):
+                self.description, self.rowcount, self._rows = description, len(rows), iter(rows)
+                return
+        stub_oursql.Cursor.execute(self, query, params, plain_query)
+
+class Connection(stub_oursql.Connection):
+    """
+    A stub connection which records the queries run on it. ``results`` maps
+    query prefixes to the ``(description, rows)`` they return, and the
+    exceptions in ``errors`` are raised by the next queries, one each; None
+    lets a query succeed.
+    """
+    def __init__(self, **kwargs):
+        stub_oursql.Connection.__init__(self, **kwargs)
+        self.queries = []
+        self.results = {}
+        self.errors = []
+        self.alive = True
+        self.pings = 0
+        self.closed = False
+
+    def cursor(self):
+        return Cursor(self)
+
+    def ping(self):
+        self.pings += 1
+        if not self.alive:
+            raise stub_oursql.OperationalError(2006, 'MySQL server has gone away')
+
+    def close(self):
+        self.closed = True
+
+def database(**options):
+    "Returns a DatabaseWrapper with ``options`` whose connections are stubs."
+    from mysql_oursql.standard.base import DatabaseWrapper
+    db = DatabaseWrapper(settings_dict(**options), 'default')
+    db._new_connection = lambda params: Connection(**params)
+    return db
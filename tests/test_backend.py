@@ -0,0 +1,235 @@
+import unittest
+from decimal import Decimal
+
+import stub_oursql
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from mysql_oursql.constants import FIELD_TYPE
+from mysql_oursql.standard import base, columnar
+from mysql_oursql.standard.base import StreamingCursorWrapper, _param_size
+from mysql_oursql.standard.retry import RetryPolicy
+from tests import Connection, database, settings_dict
+
+def deadlock():
+    return stub_oursql.OperationalError(1213, 'Deadlock found when trying to get lock')
+
+class BatchTest(unittest.TestCase):
+    def test_inserts_merged(self):
+        db = database()
+        with db.batch() as batch:
+            batch.add('INSERT INTO `a` (`b`) VALUES (%s)', [1])
+            batch.add('INSERT INTO `a` (`b`) VALUES (%s)', [2])
+            batch.add('UPDATE `c` SET `d` = %s', [3])
+            batch.add('INSERT INTO `a` (`b`) VALUES (%s)', [4])
+        self.assertEqual(batch.rowcounts, [1, 1, 1, 1])
+        self.assertEqual(db.connection.queries[-3:], [
+            ('INSERT INTO `a` (`b`) VALUES (?),(?)', (1, 2)),
+            ('UPDATE `c` SET `d` = ?', (3,)),
+            ('INSERT INTO `a` (`b`) VALUES (?)', (4,)),
+        ])
+
+    def test_error_says_which(self):
+        db = database()
+        batch = db.batch()
+        batch.add('UPDATE `c` SET `d` = %s', [1])
+        batch.add('UPDATE `c` SET `d` = %s WHERE `e` = %s', [2, 3])
+        batch.add('UPDATE `c` SET `d` = %s', [4])
+        db.cursor()
+        db.connection.errors = [None, stub_oursql.ProgrammingError(1064, 'You have an error in your SQL syntax')]
+        try:
+            batch.execute()
+        except stub_oursql.ProgrammingError, e:
+            self.assertEqual((e.batch_index, e.batch_statement, e.rowcounts),
+                             (1, 'UPDATE `c` SET `d` = %s WHERE `e` = %s', [1]))
+        else:
+            self.fail('The batch should have failed.')
+        self.assertEqual(len(db.connection.queries), 2)
+
+class ReplicaPinningTest(unittest.TestCase):
+    def test_executemany_write_pins(self):
+        db = database()
+        db.replica_set = object()
+        db.cursor().executemany('UPDATE `a` SET `b` = %s WHERE `id` = %s', [(1, 2), (3, 4)])
+        self.assertTrue(db._pinned_to_primary)
+
+class LockRetryTest(unittest.TestCase):
+    def cursor(self):
+        db = database()
+        db.retry_policy = RetryPolicy(backoff=0)
+        return db, db.cursor()
+
+    def test_deadlock_retried(self):
+        db, cursor = self.cursor()
+        db.connection.errors = [deadlock()]
+        cursor.execute('UPDATE `a` SET `b` = 1')
+        self.assertEqual(len(db.connection.queries), 2)
+
+    def test_deadlock_after_writes_not_retried(self):
+        db, cursor = self.cursor()
+        cursor.execute('INSERT INTO `a` (`b`) VALUES (1)')
+        db.connection.errors = [deadlock()]
+        self.assertRaises(stub_oursql.OperationalError, cursor.execute, 'UPDATE `a` SET `b` = 1')
+        db._commit()
+        db.connection.errors = [deadlock()]
+        cursor.execute('UPDATE `a` SET `b` = 1')
+
+    def test_lock_wait_timeout_after_writes_retried(self):
+        db, cursor = self.cursor()
+        cursor.execute('INSERT INTO `a` (`b`) VALUES (1)')
+        db.connection.errors = [stub_oursql.OperationalError(1205, 'Lock wait timeout exceeded')]
+        cursor.execute('UPDATE `a` SET `b` = 1')
+
+class RetryTransactionTest(unittest.TestCase):
+    def setUp(self):
+        self.db = database()
+        self.db.retry_policy = RetryPolicy(backoff=0)
+        # The transaction functions look the connection up by its alias.
+        self.previous = connections._connections.pop('default', None)
+        connections._connections['default'] = self.db
+        self.calls = 0
+
+    def tearDown(self):
+        del connections._connections['default']
+        if self.previous is not None:
+            connections._connections['default'] = self.previous
+
+    def update(self):
+        self.calls += 1
+        self.db.cursor().execute('UPDATE `a` SET `b` = 1')
+
+    def test_retried(self):
+        self.db.cursor()
+        self.db.connection.errors = [deadlock()]
+        self.db.retry_transaction(self.update)()
+        self.assertEqual(self.calls, 2)
+
+    def test_run_once_inside_transaction(self):
+        self.db.cursor()
+        self.db.connection.errors = [deadlock()]
+        transaction.enter_transaction_management(using='default')
+        transaction.managed(True, using='default')
+        try:
+            self.assertRaises(stub_oursql.OperationalError, self.db.retry_transaction(self.update))
+            self.assertEqual(self.calls, 1)
+        finally:
+            transaction.rollback(using='default')
+            transaction.leave_transaction_management(using='default')
+
+class SessionTest(unittest.TestCase):
+    def test_open_connection_applies_session(self):
+        db = database(time_zone='+00:00', init_command='SET @x = 1')
+        connection = db.open_connection()
+        self.assertEqual(connection.queries, [('SET SESSION time_zone = ?', ('+00:00',)),
+                                              ('SET @x = 1', ())])
+
+    def test_init_command_rerun_on_checkout(self):
+        class DatabaseWrapper(base.DatabaseWrapper):
+            # Pools open connections through the class.
+            _new_connection = classmethod(lambda cls, params: Connection(**params))
+        options = settings_dict(pool={'max_size': 1}, time_zone='+00:00', init_command='SET @x = 1')
+        options['NAME'] = 'test_init_command'
+        db = DatabaseWrapper(options, 'default')
+        db.cursor()
+        connection = db.connection
+        db.close()
+        db.cursor()
+        self.assertTrue(db.connection is connection)
+        self.assertEqual([query for query, params in connection.queries], [
+            'SET SESSION time_zone = ?', 'SET @x = 1',
+            'SET SESSION sql_mode = DEFAULT, time_zone = ?', 'SET @x = 1'])
+
+    def test_pool_follows_name(self):
+        db = database(pool=True)
+        first = db.get_pool()
+        db.settings_dict['NAME'] = 'test_test'
+        self.assertFalse(db.get_pool() is first)
+
+class FlushTest(unittest.TestCase):
+    def test_untracked_writes_flushed(self):
+        db = database(flush='delete')
+        sequences = [{'table': 'a', 'column': 'id'}, {'table': 'b', 'column': 'id'},
+                     {'table': 'c', 'column': 'id'}]
+        # The first flush truncates everything and starts tracking.
+        db.ops.sql_flush(no_style(), ['a', 'b', 'c'], sequences)
+        db.cursor().execute('INSERT INTO `a` (`x`) VALUES (1)')
+        # Another connection wrote to b, and moved c's counter.
+        db.connection.results = {
+            '(SELECT ?': ([('t', 253)], [('b',)]),
+            'SELECT table_name': ([('t', 253)], [('c',)]),
+        }
+        sql = db.ops.sql_flush(no_style(), ['a', 'b', 'c'], sequences)
+        self.assertEqual(sql, ['SET FOREIGN_KEY_CHECKS = 0;', 'DELETE FROM `a`;', 'DELETE FROM `b`;',
+                               'SET FOREIGN_KEY_CHECKS = 1;', 'ALTER TABLE `a` AUTO_INCREMENT = 1;',
+                               'ALTER TABLE `b` AUTO_INCREMENT = 1;', 'ALTER TABLE `c` AUTO_INCREMENT = 1;'])
+
+class ColumnarTest(unittest.TestCase):
+    def test_unsigned_bigint(self):
+        cursor = Connection().cursor()
+        cursor.connection.results['SELECT'] = ([('a', FIELD_TYPE.LONGLONG)], [(1,), (None,), (2 ** 64 - 1,)])
+        cursor.execute('SELECT a FROM t')
+        column = columnar.fetch_columns(cursor, use_numpy=False)[0]
+        self.assertEqual(list(column.values), [1, 0, 2 ** 64 - 1])
+        self.assertEqual(list(column.nulls), [0, 1, 0])
+
+class StreamingTest(unittest.TestCase):
+    def cursor(self, rows):
+        db = database()
+        with db.streaming():
+            cursor = db._cursor()
+        db.connection.results['SELECT'] = ([('id', 3)], rows)
+        return db, cursor
+
+    def test_rows_read_as_needed(self):
+        db, cursor = self.cursor([(i,) for i in range(5)])
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(cursor.fetchone(), (0,))
+        self.assertEqual(cursor.fetchmany(2), [(1,), (2,)])
+        # Nothing past the rows asked for has been read from the server.
+        self.assertEqual(cursor.cursor.fetchone(), (3,))
+        self.assertEqual(list(cursor), [(4,)])
+        self.assertEqual(cursor.fetchone(), None)
+
+    def test_execute_starts_afresh(self):
+        db, cursor = self.cursor([(1,), (2,)])
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(cursor.fetchone(), (1,))
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(cursor.fetchall(), [(1,), (2,)])
+
+    def test_cached_result(self):
+        db = database(streaming=True, result_cache={'tables': ['a']})
+        # Result caches are shared by every connection to a database.
+        db.settings_dict['NAME'] = 'test_streaming'
+        cursor = db._cursor()
+        db.connection.results['SELECT'] = ([('id', 3)], [(1,), (2,)])
+        for i in range(2):
+            cursor.execute('SELECT `id` FROM `a`')
+            self.assertEqual(cursor.fetchall(), [(1,), (2,)])
+        self.assertEqual(len(db.connection.queries), 1)
+
+    def test_only_inside_block(self):
+        db = database()
+        with db.streaming():
+            pass
+        self.assertFalse(isinstance(db._cursor(), StreamingCursorWrapper))
+        self.assertTrue(isinstance(database(streaming=True)._cursor(), StreamingCursorWrapper))
+
+class ParamSizeTest(unittest.TestCase):
+    def test_sizes(self):
+        self.assertEqual(_param_size(None), 2)
+        self.assertEqual(_param_size(u'\xe9t\xe9'), 20)
+        self.assertEqual(_param_size('abc'), 14)
+        self.assertEqual(_param_size(1), 34)
+
+    def test_binary_and_decimal_sized_by_length(self):
+        blob = '\0' * 1000
+        for value in (buffer(blob), bytearray(blob)):
+            self.assertEqual(_param_size(value), 1011)
+        self.assertEqual(_param_size(Decimal('1' * 60 + '.5')), 73)
+
+    def test_batches_fit_packet(self):
+        db = database()
+        cursor = db._cursor()
+        rows = [(buffer('\0' * 6000000),) for i in range(4)]
+        self.assertEqual([len(batch) for batch in cursor._insert_batches('(?)', rows)], [2, 2])
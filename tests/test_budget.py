@@ -0,0 +1,79 @@
+import unittest
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from mysql_oursql.standard import instrumentation
+from mysql_oursql.standard.budget import QueryBudget, QueryBudgetExceeded, QueryBudgetMiddleware
+from tests import database
+
+class Request(object):
+    path = '/dashboard/'
+
+class QueryBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.cursor = database()._cursor()
+
+    def run_queries(self, n):
+        for id in range(n):
+            self.cursor.execute('SELECT `name` FROM `a` WHERE `id` = %s', [id])
+            self.cursor.fetchall()
+
+    def test_within_budget(self):
+        with QueryBudget(max_queries=3, max_repeats=3, raise_errors=True) as budget:
+            self.run_queries(3)
+        self.assertEqual((budget.queries, budget.violations), (3, []))
+        self.assertEqual(instrumentation.listeners, [])
+
+    def test_repeats(self):
+        budget = QueryBudget(max_repeats=2, raise_errors=True)
+        budget.start()
+        self.run_queries(3)
+        self.cursor.execute('SELECT `id` FROM `b`')
+        try:
+            budget.stop()
+        except QueryBudgetExceeded, e:
+            message = str(e)
+        else:
+            self.fail('The budget should have been exceeded.')
+        self.assertEqual(len(budget.violations), 1)
+        self.assertTrue(message.startswith('ran the same query more than 2 times, possibly an N+1 '
+                                           'loop: SELECT `name` FROM `a` WHERE `id` = ?\n'), message)
+        # The stack points at the caller rather than into the backend.
+        self.assertTrue(__file__.rstrip('c') in message, message)
+        self.assertFalse('mysql_oursql' in message.split('\n', 1)[1], message)
+
+    def test_max_queries_and_alias(self):
+        self.assertRaises(QueryBudgetExceeded, self.budgeted, QueryBudget(max_queries=2, raise_errors=True))
+        self.budgeted(QueryBudget(max_queries=2, raise_errors=True, alias='other'))
+
+    def budgeted(self, budget):
+        with budget:
+            self.run_queries(3)
+
+    def test_nested(self):
+        outer = QueryBudget(max_queries=3)
+        with outer:
+            with QueryBudget(max_queries=1) as inner:
+                self.run_queries(1)
+            self.run_queries(1)
+        self.assertEqual((outer.queries, inner.queries), (2, 1))
+
+class QueryBudgetMiddlewareTest(unittest.TestCase):
+    def test_not_configured(self):
+        self.assertRaises(MiddlewareNotUsed, QueryBudgetMiddleware)
+
+    def test_request(self):
+        settings.OURSQL_QUERY_BUDGET = {'max_queries': 0}
+        try:
+            middleware = QueryBudgetMiddleware()
+        finally:
+            del settings.OURSQL_QUERY_BUDGET
+        request, response = Request(), object()
+        middleware.process_request(request)
+        budget = request._query_budget
+        budget.raise_errors = True
+        database()._cursor().execute('SELECT 1')
+        self.assertRaises(QueryBudgetExceeded, middleware.process_response, request, response)
+        self.assertEqual(budget.violations[0][0], '/dashboard/ ran more than 0 queries')
+        self.assertEqual(instrumentation.listeners, [])
@@ -0,0 +1,122 @@
+import unittest
+
+from mysql_oursql.standard.caching import ResultCache
+from mysql_oursql.standard.statements import StatementCache
+from mysql_oursql.standard.tracking import WriteTracker
+from mysql_oursql.standard.utils import LRUCache
+from tests import Connection, database
+
+class LRUCacheTest(unittest.TestCase):
+    def test_eviction(self):
+        evicted = []
+        cache = LRUCache(maxsize=2, on_evict=lambda key, value: evicted.append(key))
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(evicted, ['b'])
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_peek_doesnt_count_as_use(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.peek('a'), 1)
+        cache.set('c', 3)
+        self.assertFalse('a' in cache)
+
+class ResultCacheTest(unittest.TestCase):
+    query = 'SELECT `a`.`id` FROM `a` WHERE `a`.`b` = ?'
+
+    def cursor(self, rows):
+        cursor = Connection().cursor()
+        cursor.connection.results['SELECT'] = ([('id', 3)], rows)
+        cursor.execute(self.query)
+        return cursor
+
+    def test_cached_until_written(self):
+        results = ResultCache('test', ['a'])
+        key = results.key(self.query, [1])
+        self.assertEqual(results.get(key), None)
+        self.assertEqual(results.set(key, self.cursor([(1,), (2,)])).fetchall(), [(1,), (2,)])
+        self.assertEqual(results.get(key).fetchall(), [(1,), (2,)])
+        self.assertEqual(results.key(self.query, [1]), key)
+        self.assertNotEqual(results.key(self.query, [2]), key)
+        results.invalidate(['a'])
+        self.assertNotEqual(results.key(self.query, [1]), key)
+
+    def test_only_listed_tables(self):
+        results = ResultCache('test', ['a'])
+        self.assertEqual(results.key('SELECT * FROM `a` INNER JOIN `b` ON (`a`.`id` = `b`.`a_id`)', []), None)
+
+    def test_too_big_to_cache(self):
+        results = ResultCache('test', ['a'], max_rows=2)
+        key = results.key(self.query, [1])
+        cursor = self.cursor([(i,) for i in range(5)])
+        cached = results.set(key, cursor)
+        # Only max_rows + 1 rows were read before giving up.
+        self.assertEqual(cursor.fetchone(), (3,))
+        self.assertEqual(cached.fetchall(), [(0,), (1,), (2,), (4,)])
+        self.assertEqual(results.get(key), None)
+
+    def test_prefix_follows_name(self):
+        db = database(result_cache={'tables': ['a']})
+        results = db.result_cache.results
+        db.settings_dict['NAME'] = 'test_test'
+        self.assertFalse(db.result_cache.results is results)
+        self.assertNotEqual(db.result_cache.results.prefix, results.prefix)
+
+class Owner(object):
+    "Stands in for the CursorWrapper a statement's cursor is lent to."
+
+class StatementCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.closed = []
+        connection = Connection()
+        def close(cursor):
+            self.closed.append(cursor)
+        connection.cursor = lambda: type('Cursor', (object,), {'close': close})()
+        self.statements = StatementCache(connection, 1)
+
+    def test_reused(self):
+        owner = Owner()
+        cursor, prepared = self.statements.acquire('SELECT 1', owner)
+        self.assertFalse(prepared)
+        self.statements.release('SELECT 1', owner)
+        self.assertEqual(self.statements.acquire('SELECT 1', Owner()), (cursor, True))
+        self.assertEqual(self.closed, [])
+
+    def test_busy_cursor_not_shared(self):
+        first, second = Owner(), Owner()
+        cursor = self.statements.acquire('SELECT 1', first)[0]
+        other, prepared = self.statements.acquire('SELECT 1', second)
+        self.assertFalse(other is cursor or prepared)
+        self.statements.release('SELECT 1', second)
+        self.assertEqual(self.closed, [other])
+
+    def test_evicted_while_in_use(self):
+        first, second = Owner(), Owner()
+        cursor = self.statements.acquire('SELECT 1', first)[0]
+        self.statements.acquire('SELECT 2', second)
+        self.assertEqual(self.closed, [])
+        self.statements.release('SELECT 1', first)
+        self.assertEqual(self.closed, [cursor])
+        # Not in use, so closed straight away.
+        self.statements.release('SELECT 2', second)
+        self.statements.acquire('SELECT 3', first)
+        self.assertEqual(len(self.closed), 2)
+
+class WriteTrackerTest(unittest.TestCase):
+    def test_record(self):
+        tracker = WriteTracker()
+        tracker.record('INSERT INTO `a` (`b`) VALUES (?)')
+        self.assertEqual(tracker.dirty, None)
+        tracker.reset(['DELETE FROM `c`;'])
+        tracker.record('INSERT INTO `a` (`b`) VALUES (?)')
+        tracker.record('UPDATE `b` SET `c` = ?')
+        tracker.record('DELETE FROM `c`;')
+        tracker.record('SELECT * FROM `d`')
+        self.assertEqual((tracker.dirty, tracker.inserted), (set(['a', 'b']), set(['a'])))
+        tracker.record('ALTER TABLE `e` ADD INDEX (`f`)')
+        self.assertEqual(tracker.dirty, None)
@@ -0,0 +1,25 @@
+import unittest
+
+from mysql_oursql.standard import concurrency
+from tests import database
+
+@unittest.skipIf(concurrency.ThreadPoolExecutor is None, 'concurrent.futures is not installed')
+class AsyncDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.db = database(result_cache={'tables': ['a']})
+        self.workers = concurrency.AsyncDatabase(self.db, max_workers=2)
+
+    def tearDown(self):
+        self.workers.close()
+
+    def test_gather(self):
+        self.assertEqual(self.workers.gather(self.workers.fetchall('SELECT `id` FROM `a` WHERE `b` = %s', [1]),
+                                           self.workers.fetchone('SELECT `id` FROM `b`')),
+                         [[(1,)], (1,)])
+        self.assertEqual(self.db.connection, None)
+
+    def test_write_invalidates_result_cache(self):
+        results = self.db.result_cache.results
+        key = results.key('SELECT `id` FROM `a`', [])
+        self.assertEqual(self.workers.execute('UPDATE `a` SET `b` = %s', [1]).result(), 1)
+        self.assertNotEqual(results.key('SELECT `id` FROM `a`', []), key)
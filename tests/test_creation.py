@@ -0,0 +1,136 @@
+import unittest
+
+from django.conf import settings
+from django.core import management
+from django.core.management.color import no_style
+from django.db import models
+
+from django.db.backends.util import truncate_name
+
+from tests import Connection, database
+
+class Author(models.Model):
+    name = models.CharField(max_length=50, db_index=True)
+
+    class Meta:
+        app_label = 'tests'
+
+class Book(models.Model):
+    author = models.ForeignKey(Author)
+    title = models.CharField(max_length=50, db_index=True)
+
+    class Meta:
+        app_label = 'tests'
+        db_table = 'tests_book_with_a_table_name_long_enough_to_need_truncating'
+
+class DDLTest(unittest.TestCase):
+    def setUp(self):
+        self.creation = database().creation
+        self.max_length = self.creation.connection.ops.max_name_length()
+
+    def index(self, model, column):
+        name = '%s_%s' % (model._meta.db_table, self.creation._digest(column))
+        return 'ADD INDEX `%s` (`%s`)' % (truncate_name(name, self.max_length), column)
+
+    def foreign_key(self):
+        name = 'author_id_refs_id_%s' % self.creation._digest(Book._meta.db_table, Author._meta.db_table)
+        return 'ADD CONSTRAINT `%s` FOREIGN KEY (`author_id`) REFERENCES `tests_author` (`id`)' % name
+
+    def test_names_match_django(self):
+        index = self.creation.sql_index_clauses_for_field(Book, Book._meta.get_field('title'), no_style())[0]
+        name = index.split('`')[1]
+        self.assertEqual(len(name), self.max_length)
+        self.assertEqual(name, truncate_name('%s_%s' % (Book._meta.db_table, self.creation._digest('title')),
+                                             self.max_length))
+
+    def test_indexes_in_one_statement(self):
+        self.assertEqual(self.creation.sql_indexes_for_model(Book, no_style()), [
+            'ALTER TABLE `%s` %s, %s;' % (Book._meta.db_table, self.index(Book, 'author_id'),
+                                          self.index(Book, 'title'))])
+
+    def test_pending_references(self):
+        pending = {Author: [(Book, Book._meta.get_field('author'))]}
+        self.assertEqual(self.creation.sql_for_pending_references(Author, no_style(), pending), [
+            'ALTER TABLE `%s` %s;' % (Book._meta.db_table, self.foreign_key())])
+        self.assertEqual(pending, {})
+
+    def test_deferred_constraints(self):
+        with self.creation.deferred_constraints():
+            pending = {Author: [(Book, Book._meta.get_field('author'))]}
+            self.assertEqual(self.creation.sql_for_pending_references(Author, no_style(), pending), [])
+            self.assertEqual(self.creation.sql_indexes_for_model(Book, no_style()), [
+                'ALTER TABLE `%s` %s, %s, %s;' % (Book._meta.db_table, self.index(Book, 'author_id'),
+                                                  self.index(Book, 'title'), self.foreign_key())])
+            pending = {Author: [(Book, Book._meta.get_field('author'))]}
+            self.creation.sql_for_pending_references(Author, no_style(), pending)
+        # Those left over are added at the end, still one table at a time.
+        self.assertEqual(self.creation.connection.connection.queries[-1],
+                         ('ALTER TABLE `%s` %s;' % (Book._meta.db_table, self.foreign_key()), ()))
+
+class TestTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.commands = []
+        self.call_command = management.call_command
+        management.call_command = lambda name, *args, **options: self.commands.append(
+            (name, self.db.settings_dict['NAME']))
+        self.template_exists = False
+        self.connections = []
+        self.db = database()
+        self.db.settings_dict['TEST_TEMPLATE'] = True
+        self.db._new_connection = self.connect
+
+    def tearDown(self):
+        management.call_command = self.call_command
+
+    def connect(self, params):
+        connection = Connection(**params)
+        connection.results = {
+            'SELECT 1 FROM information_schema.schemata': ([('1', 8)], self.template_exists and [(1,)] or []),
+            'SELECT schema_name FROM': ([('schema_name', 253)], []),
+            'SELECT table_name FROM information_schema.tables': ([('table_name', 253)], [('a',)]),
+            'SHOW CREATE TABLE': ([('Table', 253), ('Create Table', 253)], [('a', 'CREATE TABLE `a` (`id` int)')]),
+        }
+        self.connections.append(connection)
+        return connection
+
+    def queries(self):
+        return [query for connection in self.connections for query, params in connection.queries]
+
+    def test_template_built_then_cloned(self):
+        template = self.db.creation._test_template_name()
+        self.assertEqual(self.db.creation.create_test_db(verbosity=0), 'test_test')
+        self.assertEqual(self.commands, [('syncdb', template), ('flush', template)])
+        queries = self.queries()
+        self.assertTrue('CREATE DATABASE `%s` ' % template in queries)
+        self.assertTrue('INSERT INTO `a` SELECT * FROM `%s`.`a`' % template in queries)
+        self.assertEqual(self.db.settings_dict['NAME'], 'test_test')
+        self.assertFalse(self.db.features.supports_transactions is None)
+
+    def test_cache_table_in_template(self):
+        caches, models_hash = settings.CACHES, self.db.creation._models_hash()
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                       'LOCATION': 'cache_table'}}
+        try:
+            # The template is rebuilt once the cache table is wanted.
+            self.assertNotEqual(self.db.creation._models_hash(), models_hash)
+            template = self.db.creation._test_template_name()
+            self.db.creation.create_test_db(verbosity=0)
+        finally:
+            settings.CACHES = caches
+        self.assertEqual(self.commands[-1], ('createcachetable', template))
+
+    def test_existing_template_cloned(self):
+        self.template_exists = True
+        self.db.creation.create_test_db(verbosity=0)
+        self.assertEqual(self.commands, [])
+        self.assertTrue('CREATE TABLE `a` (`id` int)' in self.queries())
+
+    def test_clones_dropped(self):
+        self.template_exists = True
+        creation = self.db.creation
+        creation.create_test_db(verbosity=0)
+        self.assertEqual(creation.clone_test_db('1', verbosity=0), 'test_test_1')
+        creation.destroy_test_db('test', verbosity=0)
+        queries = self.queries()
+        self.assertTrue('DROP DATABASE IF EXISTS `test_test_1`' in queries)
+        self.assertEqual(queries[-1], 'DROP DATABASE `test_test`')
@@ -0,0 +1,54 @@
+import unittest
+
+from mysql_oursql.constants import FIELD_TYPE
+from mysql_oursql.gis import base
+from tests import Connection, settings_dict
+
+# MySQL's representation of POINT(1 2) with SRID 4326: the SRID, then WKB.
+POINT_WKB = '\x01\x01\x00\x00\x00' + '\x00' * 6 + '\xf0\x3f' + '\x00' * 7 + '\x40'
+POINT = '\xe6\x10\x00\x00' + POINT_WKB
+
+class Geometry(object):
+    wkb = POINT_WKB
+    srid = 4326
+
+class WKBTest(unittest.TestCase):
+    def database(self, **options):
+        db = base.DatabaseWrapper(settings_dict(**options), 'default')
+        db._new_connection = lambda params: Connection(**params)
+        return db
+
+    def test_converter(self):
+        convert = base.wkb_converter((1,))
+        row = convert((1, POINT, 'a'))
+        self.assertEqual((row[0], str(row[1]), row[2]), (1, POINT_WKB, 'a'))
+        self.assertEqual(convert((2, None, 'b')), (2, None, 'b'))
+        self.assertEqual(convert(None), None)
+
+    def test_cursor(self):
+        db = self.database(geometry_format='wkb')
+        cursor = db._cursor()
+        db.connection.results['SELECT'] = ([('id', FIELD_TYPE.LONG), ('point', FIELD_TYPE.GEOMETRY)],
+                                           [(1, POINT), (2, POINT), (3, None)])
+        cursor.execute('SELECT `id`, `point` FROM `a`')
+        self.assertEqual(str(cursor.fetchone()[1]), POINT_WKB)
+        self.assertEqual([str(row[1]) for row in cursor.fetchmany(1)], [POINT_WKB])
+        self.assertEqual(cursor.fetchall(), [(3, None)])
+        # Results without geometries are left alone.
+        db.connection.results['SELECT'] = ([('id', FIELD_TYPE.LONG)], [(1,)])
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(cursor.fetchone, cursor.cursor.fetchone)
+
+    def test_streaming_cursor(self):
+        db = self.database(geometry_format='wkb', streaming=True)
+        cursor = db._cursor()
+        db.connection.results['SELECT'] = ([('point', FIELD_TYPE.GEOMETRY)], [(POINT,), (POINT,)])
+        cursor.execute('SELECT `point` FROM `a`')
+        self.assertEqual([str(row[0]) for row in cursor], [POINT_WKB, POINT_WKB])
+
+    def test_adapter(self):
+        ops = self.database(geometry_format='wkb').ops
+        self.assertEqual((ops.select, ops.get_geom_placeholder(Geometry(), 4326)), (None, 'GeomFromWKB(%s)'))
+        adapter = ops.Adapter(Geometry())
+        self.assertEqual((adapter, adapter.srid), (POINT_WKB, 4326))
+        self.assertEqual(self.database().ops.get_geom_placeholder(Geometry(), 4326), 'GeomFromText(%s)')
@@ -0,0 +1,73 @@
+import unittest
+
+import stub_oursql
+
+from mysql_oursql.standard import instrumentation
+from tests import database
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.listener = self.events.append
+        instrumentation.register(self.listener)
+
+    def tearDown(self):
+        instrumentation.unregister(self.listener)
+
+    def cursor(self):
+        db = database()
+        cursor = db._cursor()
+        db.connection.results['SELECT'] = ([('id', 3), ('name', 253)], [(1, 'ab'), (2, None)])
+        return cursor
+
+    def test_events(self):
+        cursor = self.cursor()
+        cursor.execute('SELECT `id`, `name` FROM `a` WHERE `id` IN (%s, %s)', [1, 2])
+        self.assertEqual(cursor.fetchall(), [(1, 'ab'), (2, None)])
+        execute, fetch = self.events
+        self.assertEqual((execute.kind, execute.alias, execute.rows, execute.error),
+                         ('execute', 'default', 2, None))
+        self.assertEqual(execute.fingerprint, 'SELECT `id`, `name` FROM `a` WHERE `id` IN (?+)')
+        self.assertEqual((fetch.kind, fetch.rows, fetch.bytes), ('fetch', 2, 18))
+
+    def test_error(self):
+        cursor = self.cursor()
+        cursor.cursor.connection.errors = [stub_oursql.ProgrammingError(1146, "Table 'a' doesn't exist")]
+        self.assertRaises(stub_oursql.ProgrammingError, cursor.execute, 'SELECT `id` FROM `a`')
+        self.assertTrue(isinstance(self.events[0].error, stub_oursql.ProgrammingError))
+
+    def test_broken_listener_ignored(self):
+        def broken(event):
+            raise ValueError
+        instrumentation.register(broken)
+        instrumentation.logger.disabled = True
+        try:
+            cursor = self.cursor()
+            cursor.execute('SELECT `id` FROM `a`')
+        finally:
+            instrumentation.unregister(broken)
+            instrumentation.logger.disabled = False
+        self.assertEqual(len(self.events), 1)
+
+    def test_unregistered_rebinds(self):
+        cursor = self.cursor()
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(cursor.fetchone, cursor._fetchone)
+        instrumentation.unregister(self.listener)
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(cursor.fetchone, cursor.cursor.fetchone)
+        self.assertEqual(len(self.events), 1)
+
+    def test_histogram(self):
+        histogram = instrumentation.Histogram()
+        instrumentation.register(histogram)
+        try:
+            cursor = self.cursor()
+            for id in (1, 2):
+                cursor.execute('SELECT `id`, `name` FROM `a` WHERE `id` = %s', [id])
+                cursor.fetchall()
+        finally:
+            instrumentation.unregister(histogram)
+        [(fingerprint, stats)] = histogram.slowest()
+        self.assertEqual(fingerprint, 'SELECT `id`, `name` FROM `a` WHERE `id` = ?')
+        self.assertEqual((stats['calls'], stats['rows'], stats['bytes']), (2, 4, 36))
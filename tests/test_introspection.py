@@ -0,0 +1,63 @@
+import unittest
+
+import stub_oursql
+
+from mysql_oursql.constants import FIELD_TYPE
+from tests import database
+
+class BulkIntrospectionTest(unittest.TestCase):
+    def database(self):
+        db = database(bulk_introspection=True)
+        cursor = db._cursor()
+        db.connection.results = {
+            'SELECT table_name, column_name, data_type': ([], [
+                ('a', 'id', 'int', 10, 10, 0, 'NO'),
+                ('a', 'name', 'varchar', 50, None, None, 'YES'),
+                ('a', 'location', 'point', None, None, None, 'YES'),
+                ('a', 'extra', 'json', None, None, None, 'YES'),
+                ('b', 'id', 'int', 10, 10, 0, 'NO'),
+                ('b', 'a_id', 'int', 10, 10, 0, 'NO'),
+            ]),
+            'SELECT table_name, column_name, referenced_table_name': ([], [('b', 'a_id', 'a', 'id')]),
+            'SELECT table_name, column_name, index_name': ([], [
+                ('b', 'a_id', 'b_a_id', 1),
+                ('a', 'id', 'PRIMARY', 0),
+                ('b', 'id', 'PRIMARY', 0),
+            ]),
+            'SHOW TABLES': ([('t', 253)], [('a',), ('b',)]),
+        }
+        return db, cursor
+
+    def test_loaded_once(self):
+        db, cursor = self.database()
+        introspection = db.introspection
+        self.assertEqual(introspection.get_table_list(cursor), ['a', 'b'])
+        queries = len(db.connection.queries)
+        self.assertEqual([(column[0], column[1]) for column in introspection.get_table_description(cursor, 'a')],
+                         [('id', FIELD_TYPE.LONG), ('name', FIELD_TYPE.VAR_STRING),
+                          ('location', FIELD_TYPE.GEOMETRY), ('extra', FIELD_TYPE.STRING)])
+        self.assertEqual(introspection.get_relations(cursor, 'b'), {1: (0, 'a')})
+        self.assertEqual(introspection.get_indexes(cursor, 'b'), {
+            'a_id': {'primary_key': False, 'unique': False},
+            'id': {'primary_key': True, 'unique': True},
+        })
+        self.assertEqual(len(db.connection.queries), queries)
+
+    def test_bulk_block(self):
+        db = database()
+        cursor = db._cursor()
+        db.connection.results = {
+            'SELECT table_name, column_name, data_type': ([], [('a', 'id', 'int', 10, 10, 0, 'NO')]),
+            'SELECT table_name, column_name, referenced_table_name': ([], []),
+            'SELECT table_name, column_name, index_name': ([], []),
+        }
+        with db.introspection.bulk(cursor):
+            self.assertEqual(db.introspection.get_indexes(cursor, 'a'), {})
+        self.assertEqual(db.connection_state.get('schema'), None)
+
+    def test_missing_information_schema(self):
+        db = database()
+        cursor = db._cursor()
+        db.connection.errors = [stub_oursql.ProgrammingError(1146, "Table 'information_schema.columns' doesn't exist")]
+        db.introspection.load_schema(cursor)
+        self.assertEqual(db.connection_state.get('schema'), None)
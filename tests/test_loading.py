@@ -0,0 +1,48 @@
+import datetime
+import unittest
+from decimal import Decimal
+
+from django.conf import settings
+
+from mysql_oursql.standard.loading import to_field
+from tests import Cursor, database
+
+class ToFieldTest(unittest.TestCase):
+    def test_fields(self):
+        ops = database().ops
+        for value, field in ((None, '\\N'), (u'caf\xe9', 'caf\xc3\xa9'), ('a\tb\nc\\d\0', 'a\\tb\\nc\\\\d\\0'),
+                             (True, '1'), (12L, '12'), (Decimal('1.50'), '1.50'), (0.1, '0.1'),
+                             (datetime.datetime(2010, 1, 2, 3, 4, 5), '2010-01-02 03:04:05'),
+                             (datetime.date(2010, 1, 2), '2010-01-02'),
+                             (datetime.time(3, 4, 5), '03:04:05')):
+            self.assertEqual(to_field(value, ops, 'utf-8'), field)
+
+class BulkLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.files = []
+        files = self.files
+        class LoadingCursor(Cursor):
+            def execute(self, query, params=(), plain_query=False):
+                if query.startswith('LOAD DATA'):
+                    files.append(open(query.split("'")[1], 'rb').read())
+                return Cursor.execute(self, query, params, plain_query)
+        self.db = database()
+        self.db.cursor()
+        self.db.connection.cursor = lambda: LoadingCursor(self.db.connection)
+
+    def test_chunks(self):
+        rows = [(1, u'a'), (2, None), (3, u'c')]
+        self.assertEqual(self.db.bulk_load('t', ['id', 'name'], rows, chunk_size=2), 2)
+        self.assertEqual(self.files, ['1\ta\n2\t\\N\n', '3\tc\n'])
+        query = self.db.connection.queries[-1][0]
+        self.assertTrue(query.startswith("LOAD DATA LOCAL INFILE '"), query)
+        self.assertTrue(query.endswith("' INTO TABLE `t` CHARACTER SET utf8 (`id`, `name`)"), query)
+
+    def test_debug_cursor(self):
+        debug = settings.DEBUG
+        settings.DEBUG = True
+        try:
+            self.db.bulk_load('t', ['id'], [(1,)])
+        finally:
+            settings.DEBUG = debug
+        self.assertEqual(self.files, ['1\n'])
@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+import stub_oursql
+
+from mysql_oursql.standard.pool import ConnectionPool, PoolTimeout
+from tests import Connection
+
+class ConnectionPoolTest(unittest.TestCase):
+    def pool(self, **options):
+        self.opened = []
+        def connect():
+            connection = Connection()
+            self.opened.append(connection)
+            return connection
+        return ConnectionPool(connect, **options)
+
+    def test_checkin_reuses(self):
+        pool = self.pool()
+        connection = pool.checkout()
+        pool.checkin(connection)
+        self.assertTrue(pool.checkout() is connection)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_checkin_resets_session(self):
+        pool = self.pool()
+        connection = pool.checkout()
+        pool.state(connection)['session'] = {'time_zone': '+00:00'}
+        pool.checkin(connection)
+        self.assertEqual(connection.queries[-1],
+                         ('SET SESSION sql_mode = DEFAULT, time_zone = ?', ('+00:00',)))
+
+    def test_timeout(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        pool.checkout()
+        start = time.time()
+        self.assertRaises(PoolTimeout, pool.checkout)
+        self.assertTrue(time.time() - start >= 0.05)
+
+    def test_waiter_gets_returned_connection(self):
+        pool = self.pool(max_size=1, timeout=5)
+        connection = pool.checkout()
+        threading.Timer(0.05, pool.checkin, [connection]).start()
+        self.assertTrue(pool.checkout() is connection)
+
+    def test_overflow_closed_on_checkin(self):
+        pool = self.pool(max_size=1, overflow=1)
+        first, second = pool.checkout(), pool.checkout()
+        pool.checkin(first)
+        pool.checkin(second)
+        self.assertEqual([c.closed for c in (first, second)], [True, False])
+        self.assertEqual(len(pool._idle), 1)
+
+    def test_expired_replaced(self):
+        pool = self.pool(max_lifetime=60)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        pool._idle[-1] = (connection, time.time() - 120, pool._idle[-1][2])
+        self.assertFalse(pool.checkout() is connection)
+        self.assertTrue(connection.closed)
+
+    def test_idle_connection_pinged(self):
+        pool = self.pool(ping_after=30)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        self.assertTrue(pool.checkout() is connection)
+        self.assertEqual(connection.pings, 0)
+        pool.checkin(connection)
+        connection.alive = False
+        pool._idle[-1] = (connection, pool._idle[-1][1], time.time() - 60)
+        replacement = pool.checkout()
+        self.assertFalse(replacement is connection)
+        self.assertEqual(connection.pings, 1)
+        self.assertTrue(connection.closed)
+
+    def test_broken_connection_discarded(self):
+        pool = self.pool()
+        connection = pool.checkout()
+        def rollback():
+            raise stub_oursql.OperationalError(2013, 'Lost connection')
+        connection.rollback = rollback
+        pool.checkin(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool._idle, [])
+
+    def test_min_idle(self):
+        pool = self.pool(min_idle=2)
+        self.assertEqual(len(self.opened), 2)
+        pool.discard(pool.checkout())
+        self.assertEqual(len(pool._idle), 2)
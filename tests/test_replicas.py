@@ -0,0 +1,76 @@
+import unittest
+
+import stub_oursql
+
+from mysql_oursql.standard.replicas import ReplicaSet
+from tests import Connection, database
+
+class ReplicaSetTest(unittest.TestCase):
+    def test_weighted_round_robin(self):
+        replica_set = ReplicaSet([{'weight': 2}, {}])
+        self.assertEqual([replica_set.choose() for i in range(6)], [0, 1, 0, 0, 1, 0])
+
+    def test_least_connections(self):
+        replica_set = ReplicaSet([{}, {}], strategy='least_connections')
+        self.assertEqual((replica_set.choose(), replica_set.choose()), (0, 1))
+        replica_set.release(0)
+        self.assertEqual(replica_set.choose(), 0)
+
+    def test_unhealthy_skipped(self):
+        replica_set = ReplicaSet([{}, {}])
+        replica_set.mark(0, False)
+        self.assertEqual([replica_set.choose() for i in range(2)], [1, 1])
+        self.assertEqual(replica_set.choose(exclude=[1]), None)
+        replica_set.check_interval = -1
+        self.assertEqual(replica_set.choose(exclude=[1]), 0)
+
+    def test_check(self):
+        replica_set = ReplicaSet([{}], max_lag=30)
+        connection = Connection()
+        description = [('Slave_IO_Running', 253), ('Seconds_Behind_Master', 8)]
+        for rows, healthy in (([], True), ([('Yes', 10)], True), ([('Yes', 31)], False),
+                              ([('No', None)], False)):
+            connection.results['SHOW SLAVE STATUS'] = (description, rows)
+            self.assertEqual(replica_set.check(0, connection), healthy)
+        connection.errors = [stub_oursql.OperationalError(2013, 'Lost connection')]
+        self.assertFalse(replica_set.check(0, connection))
+        self.assertFalse(replica_set.needs_check(0))
+
+class ReplicaRoutingTest(unittest.TestCase):
+    def database(self):
+        db = database()
+        db.replica_set = ReplicaSet([{'HOST': 'replica'}])
+        return db
+
+    def test_reads_go_to_replica(self):
+        db = self.database()
+        cursor = db._cursor()
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(db.replica_connection.kwargs['host'], 'replica')
+        self.assertEqual(db.replica_connection.queries[-1], ('SELECT `id` FROM `a`', ()))
+        self.assertEqual(db.connection.queries, [])
+
+    def test_writes_pin_to_primary(self):
+        db = self.database()
+        cursor = db._cursor()
+        cursor.execute('UPDATE `a` SET `b` = 1')
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(db.replica_connection, None)
+        self.assertEqual(len(db.connection.queries), 2)
+        db.close()
+        db._cursor().execute('SELECT `id` FROM `a`')
+        self.assertFalse(db.replica_connection is None)
+
+    def test_locking_reads_stay_on_primary(self):
+        db = self.database()
+        db._cursor().execute('SELECT `id` FROM `a` FOR UPDATE')
+        self.assertEqual(db.replica_connection, None)
+
+    def test_failed_replica_falls_back(self):
+        db = self.database()
+        cursor = db._cursor()
+        cursor.execute('SELECT `id` FROM `a`')
+        db.replica_connection.errors = [stub_oursql.OperationalError(2013, 'Lost connection')]
+        cursor.execute('SELECT `id` FROM `a`')
+        self.assertEqual(db.connection.queries[-1], ('SELECT `id` FROM `a`', ()))
+        self.assertEqual(db.replica_set.choose(), None)
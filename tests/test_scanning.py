@@ -0,0 +1,55 @@
+import unittest
+
+from mysql_oursql.standard import base
+from mysql_oursql.standard.scanning import _scan_sql
+from tests import Connection, Cursor, database, settings_dict
+
+class TableCursor(Cursor):
+    "Answers scans of a table holding ids 1 to 5."
+    def execute(self, query, params=(), plain_query=False):
+        Cursor.execute(self, query, params, plain_query)
+        ids = range(1, 6)
+        if '`id` > ?' in query:
+            ids = [id for id in ids if id > params[0]]
+        self.description = [('id', 3)]
+        self._rows = iter([(id,) for id in ids[:int(query.rsplit(' ', 1)[1])]])
+
+class TableConnection(Connection):
+    def cursor(self):
+        return TableCursor(self)
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Set on the class, since Django's connections are thread-local and
+    # prefetching scans connect from another thread.
+    _new_connection = classmethod(lambda cls, params: TableConnection(**params))
+
+class ScanTest(unittest.TestCase):
+    def database(self):
+        return DatabaseWrapper(settings_dict(), 'default')
+
+    def test_sql(self):
+        ops = database().ops
+        self.assertEqual(_scan_sql(ops, 'a', ['id', 'b'], 'id', None, 100), (
+            'SELECT `id`, `b` FROM `a` ORDER BY `id` LIMIT 100',
+            'SELECT `id`, `b` FROM `a` WHERE `id` > %s ORDER BY `id` LIMIT 100'))
+        self.assertEqual(_scan_sql(ops, 'a', None, 'id', 'b = %s OR c', 100), (
+            'SELECT * FROM `a` WHERE (b = %s OR c) ORDER BY `id` LIMIT 100',
+            'SELECT * FROM `a` WHERE `id` > %s AND (b = %s OR c) ORDER BY `id` LIMIT 100'))
+
+    def test_chunks(self):
+        db = self.database()
+        self.assertEqual(list(db.scan('a', chunk_size=2)), [[(1,), (2,)], [(3,), (4,)], [(5,)]])
+        self.assertEqual([params for query, params in db.connection.queries], [(), (2,), (4,)])
+
+    def test_exact_multiple(self):
+        db = self.database()
+        self.assertEqual(len(list(db.scan('a', chunk_size=5))), 1)
+        self.assertEqual(len(db.connection.queries), 2)
+
+    def test_prefetch(self):
+        db = self.database()
+        self.assertEqual(list(db.scan('a', chunk_size=2, prefetch=True)), [[(1,), (2,)], [(3,), (4,)], [(5,)]])
+        self.assertEqual(db.connection, None)
+
+    def test_pk_must_be_read(self):
+        self.assertRaises(ValueError, self.database().scan, 'a', ['b'])
@@ -0,0 +1,102 @@
+import unittest
+
+from mysql_oursql.standard.base import insert_values_re, rewrite_query
+from mysql_oursql.standard.caching import read_tables
+from mysql_oursql.standard.instrumentation import fingerprint
+from mysql_oursql.standard.operations import DatabaseOperations
+from mysql_oursql.standard.replicas import is_replica_safe
+from mysql_oursql.standard.tracking import UNKNOWN, parse_write
+
+class RewriteQueryTest(unittest.TestCase):
+    def test_placeholders(self):
+        self.assertEqual(rewrite_query('SELECT a FROM t WHERE b = %s AND c IN (%s, %s)'),
+                         'SELECT a FROM t WHERE b = ? AND c IN (?, ?)')
+
+    def test_escaped_percent(self):
+        self.assertEqual(rewrite_query("SELECT a FROM t WHERE b LIKE %s ESCAPE '\\\\' AND c %% 2"),
+                         "SELECT a FROM t WHERE b LIKE ? ESCAPE '\\\\' AND c % 2")
+
+    def test_quoted_literals_are_left_alone(self):
+        self.assertEqual(rewrite_query("SELECT '%s', \"%s\", `%s` FROM t WHERE a = %s"),
+                         "SELECT '%s', \"%s\", `%s` FROM t WHERE a = ?")
+        self.assertEqual(rewrite_query("SELECT 'it''s %s', 'a\\'%s' FROM t WHERE a = %s"),
+                         "SELECT 'it''s %s', 'a\\'%s' FROM t WHERE a = ?")
+
+    def test_percent_unescaped_inside_literals(self):
+        self.assertEqual(rewrite_query("SELECT a FROM t WHERE b LIKE '100%%'"),
+                         "SELECT a FROM t WHERE b LIKE '100%'")
+
+    def test_insert_values(self):
+        match = insert_values_re.match('INSERT INTO `t` (`a`, `b`) VALUES (?, ?)')
+        self.assertEqual(match.group(2), '(?, ?)')
+        self.assertEqual(insert_values_re.match('INSERT INTO t (a) VALUES (?, NOW())'), None)
+        self.assertEqual(insert_values_re.match('INSERT INTO t (a) SELECT a FROM u WHERE b = ?'), None)
+
+class ParseWriteTest(unittest.TestCase):
+    def test_inserts(self):
+        self.assertEqual(parse_write('INSERT INTO `app_a` (`b`) VALUES (?)'), ('app_a', True))
+        self.assertEqual(parse_write('INSERT IGNORE INTO app_a VALUES (?)'), ('app_a', True))
+        self.assertEqual(parse_write('REPLACE INTO app_a VALUES (?)'), ('app_a', True))
+        self.assertEqual(parse_write("LOAD DATA LOCAL INFILE '/tmp/x\\'y.tsv' INTO TABLE `app_a` (`b`)"),
+                         ('app_a', True))
+
+    def test_updates_and_deletes(self):
+        self.assertEqual(parse_write('UPDATE `app_a` SET `b` = ? WHERE `id` = ?'), ('app_a', False))
+        self.assertEqual(parse_write('DELETE FROM `app_a` WHERE `id` IN (?, ?)'), ('app_a', False))
+        self.assertEqual(parse_write('DELETE FROM app_a'), ('app_a', False))
+
+    def test_reads(self):
+        for query in ('SELECT 1', 'SHOW TABLES', 'SET SESSION sql_mode = ?', 'COMMIT'):
+            self.assertEqual(parse_write(query), None)
+
+    def test_unknown(self):
+        for query in ('ALTER TABLE app_a ADD INDEX (b)', 'TRUNCATE app_a',
+                      'DELETE app_a FROM app_a JOIN app_b ON app_a.id = app_b.a_id',
+                      'UPDATE app_a, app_b SET app_a.b = app_b.b'):
+            self.assertTrue(parse_write(query) is UNKNOWN, query)
+
+class ReadTablesTest(unittest.TestCase):
+    def test_tables(self):
+        self.assertEqual(read_tables('SELECT * FROM `app_a` INNER JOIN `app_b` ON (`app_a`.`id` = `app_b`.`a_id`)'),
+                         set(['app_a', 'app_b']))
+        self.assertEqual(read_tables('SELECT * FROM app_a, `app_b` WHERE app_a.id = app_b.a_id'),
+                         set(['app_a', 'app_b']))
+
+    def test_uncacheable(self):
+        for query in ('SELECT * FROM app_a FOR UPDATE', 'SELECT * FROM app_a LOCK IN SHARE MODE',
+                      'SELECT * FROM app_a WHERE created < NOW()', 'SELECT RAND() FROM app_a',
+                      'SELECT @x FROM app_a', 'UPDATE app_a SET b = 1', 'SELECT 1'):
+            self.assertEqual(read_tables(query), None, query)
+
+class FingerprintTest(unittest.TestCase):
+    def test_literals(self):
+        self.assertEqual(fingerprint("SELECT `a`  FROM t\n WHERE b = 'x' AND c = 1.5 AND d = \"y\""),
+                         'SELECT `a` FROM t WHERE b = ? AND c = ? AND d = ?')
+
+    def test_in_lists(self):
+        self.assertEqual(fingerprint('SELECT a FROM t WHERE id IN (?, ?, ?)'),
+                         fingerprint('SELECT a FROM t WHERE id IN (?, ?)'))
+
+    def test_identifiers_kept(self):
+        self.assertEqual(fingerprint('SELECT `t1`.`a` FROM `t1`'), 'SELECT `t1`.`a` FROM `t1`')
+        self.assertEqual(fingerprint('SELECT a FROM t1'), 'SELECT a FROM t1')
+
+class ReplicaSafeTest(unittest.TestCase):
+    def test_replica_safe(self):
+        self.assertTrue(is_replica_safe('  select a FROM t'))
+        self.assertFalse(is_replica_safe('SELECT a FROM t FOR UPDATE'))
+        self.assertFalse(is_replica_safe('SELECT a FROM t LOCK IN SHARE MODE'))
+        self.assertFalse(is_replica_safe('UPDATE t SET a = 1'))
+
+class DateTruncTest(unittest.TestCase):
+    def test_date_trunc(self):
+        ops = DatabaseOperations()
+        for lookup_type, sql in (
+                ('year', 'TIMESTAMP(MAKEDATE(YEAR(d), 1))'),
+                ('month', 'TIMESTAMP(MAKEDATE(YEAR(d), 1) + INTERVAL (MONTH(d) - 1) MONTH)'),
+                ('day', 'TIMESTAMP(DATE(d))'),
+                ('hour', 'TIMESTAMP(DATE(d), MAKETIME(HOUR(d), 0, 0))'),
+                ('minute', 'TIMESTAMP(DATE(d), MAKETIME(HOUR(d), MINUTE(d), 0))'),
+                ('second', 'TIMESTAMP(DATE(d), MAKETIME(HOUR(d), MINUTE(d), SECOND(d)))'),
+                ('week', 'd')):
+            self.assertEqual(ops.date_trunc_sql(lookup_type, 'd'), sql)